@@ -0,0 +1,208 @@
+import heapq
+import json
+import os
+import zlib
+
+from catalog import HEALTHIER_ALTERNATIVES, HEALTHIER_MATCHER, CatalogMatcher, normalize_name
+from history_index import date_ordinal, purchase_day
+from model import date_string, expired_day
+from storage import write_json_atomic
+
+# Purchase Analytics
+# Rollups over every purchase, in the hot window and the archive, folded in
+# one purchase at a time in date order:
+#   - quantity per category per week (weeks start on Monday);
+#   - lines and quantity per item;
+#   - waste: a line counts as wasted when its expired_date passed before the
+#     item was bought again. The newest line of each item stays open until
+#     then; open lines already past expiry are reported as waste at view time;
+#   - healthy swaps: lines matching a HEALTHIER_ALTERNATIVES item and lines
+#     matching its alternative.
+# The views only read these tables, so their cost depends on the number of
+# distinct items and weeks shown, not on the length of the history.
+#
+# The rollups are saved next to the data file with the number of purchases
+# they cover and a fingerprint of the newest one. That is enough to fold in
+# purchases recorded since, or to notice the file is out of step and rebuild
+# it. After a purchase they are saved by the session's writer, under the store
+# lock, only when the purchase was committed as is.
+ROLLUP_VERSION = 1
+ALTERNATIVE_MATCHER = CatalogMatcher({entry['alt']: key for key, entry in HEALTHIER_ALTERNATIVES.items()})
+
+# Open line fields
+OPEN_DAY, OPEN_EXPIRES, OPEN_QUANTITY, OPEN_CATEGORY = range(4)
+
+
+def week_start(ordinal):
+    # Ordinal 1 (0001-01-01) is a Monday
+    return ordinal - (ordinal - 1) % 7
+
+
+def purchase_fingerprint(purchase):
+    # Stable across backends (SQLite hands quantities back as floats)
+    lines = tuple((normalize_name(line['name']), float(line.get('quantity') or 0)) for line in purchase['items'])
+    return zlib.crc32(repr((purchase.get('date'), lines)).encode('utf-8'))
+
+
+def rollup_path(data_path):
+    return f"{data_path}.analytics.json"
+
+
+def _add(table, key, category, quantity):
+    totals = table.get(key)
+    if totals is None:
+        totals = table[key] = {}
+    totals[category] = totals.get(category, 0) + quantity
+
+
+class PurchaseRollups:
+    def __init__(self):
+        self.purchases = 0  # Purchases folded in
+        self.newest = None  # Fingerprint of the last one
+        self.weeks = {}  # week start ordinal -> {category: quantity}
+        self.items = {}  # normalized name -> [name, lines, quantity]
+        self.waste = {}  # week start ordinal -> {category: quantity}, by expiry week
+        self.open = {}  # normalized name -> newest line [day, expiry ordinal, quantity, category]
+        self.swaps = {}  # HEALTHIER_ALTERNATIVES key -> [original lines, alternative lines]
+
+    @classmethod
+    def build(cls, purchases):
+        # `purchases` oldest first
+        rollups = cls()
+        for purchase in purchases:
+            rollups.record_purchase(purchase)
+        return rollups
+
+    def record_purchase(self, purchase):
+        self.purchases += 1
+        self.newest = purchase_fingerprint(purchase)
+        try:
+            day = purchase_day(purchase)
+        except (KeyError, TypeError, ValueError):
+            return
+        week = week_start(day)
+        for line in purchase['items']:
+            name = line['name']
+            key = normalize_name(name)
+            quantity = float(line.get('quantity') or 0)
+            category = line.get('category') or 'Other'
+            _add(self.weeks, week, category, quantity)
+
+            item = self.items.get(key)
+            if item is None:
+                self.items[key] = [name, 1, quantity]
+            else:
+                item[0] = name
+                item[1] += 1
+                item[2] += quantity
+
+            expires = expired_day(line)
+            previous = self.open.get(key)
+            if previous is None or day > previous[OPEN_DAY]:
+                if previous is not None and previous[OPEN_EXPIRES] is not None and previous[OPEN_EXPIRES] < day:
+                    _add(self.waste, week_start(previous[OPEN_EXPIRES]), previous[OPEN_CATEGORY], previous[OPEN_QUANTITY])
+                self.open[key] = [day, expires, quantity, category]
+            elif day == previous[OPEN_DAY]:
+                # Another line on the same day joins the open one
+                previous[OPEN_QUANTITY] += quantity
+                if expires is not None and (previous[OPEN_EXPIRES] is None or expires > previous[OPEN_EXPIRES]):
+                    previous[OPEN_EXPIRES] = expires
+
+            swap = ALTERNATIVE_MATCHER.lookup(name, contained_only=True)
+            if swap is not None:
+                self.swaps.setdefault(swap, [0, 0])[1] += 1
+            else:
+                original = HEALTHIER_MATCHER.match_key(name, contained_only=True)
+                if original is not None:
+                    self.swaps.setdefault(original, [0, 0])[0] += 1
+
+    # Views
+    def category_weeks(self, today_ordinal, weeks=8):
+        # [(week start, {category: quantity})] for the last `weeks` weeks, oldest first
+        current = week_start(today_ordinal)
+        return [(date_string(start), dict(self.weeks.get(start, {})))
+                for start in range(current - 7 * (weeks - 1), current + 1, 7)]
+
+    def top_items(self, k=10):
+        # [(name, lines, quantity)] by quantity bought
+        return [tuple(item) for item in heapq.nlargest(k, self.items.values(), key=lambda item: item[2])]
+
+    def wasted(self, today_ordinal, weeks=8):
+        # ({category: quantity} over the last `weeks` weeks, total quantity ever).
+        # Open lines already expired count from their expiry week.
+        first_week = week_start(today_ordinal) - 7 * (weeks - 1)
+        recent = {}
+        total = 0.0
+        for start, totals in self.waste.items():
+            for category, quantity in totals.items():
+                total += quantity
+                if start >= first_week:
+                    recent[category] = recent.get(category, 0) + quantity
+        for _, expires, quantity, category in self.open.values():
+            if expires is not None and expires < today_ordinal:
+                total += quantity
+                if week_start(expires) >= first_week:
+                    recent[category] = recent.get(category, 0) + quantity
+        return recent, total
+
+    def swap_adoption(self):
+        # [(item, alternative, original lines, alternative lines)], most bought first
+        rows = [(key, HEALTHIER_ALTERNATIVES[key]['alt'], original, alternative)
+                for key, (original, alternative) in self.swaps.items()]
+        return sorted(rows, key=lambda row: -(row[2] + row[3]))
+
+    # Persistence
+    def to_json(self):
+        return {
+            'version': ROLLUP_VERSION,
+            'purchases': self.purchases,
+            'newest': self.newest,
+            'weeks': {date_string(start): totals for start, totals in self.weeks.items()},
+            'items': self.items,
+            'waste': {date_string(start): totals for start, totals in self.waste.items()},
+            'open': self.open,
+            'swaps': self.swaps
+        }
+
+    @classmethod
+    def from_json(cls, data):
+        rollups = cls()
+        rollups.purchases = data['purchases']
+        rollups.newest = data['newest']
+        rollups.weeks = {date_ordinal(start): totals for start, totals in data['weeks'].items()}
+        rollups.items = data['items']
+        rollups.waste = {date_ordinal(start): totals for start, totals in data['waste'].items()}
+        rollups.open = data['open']
+        rollups.swaps = data['swaps']
+        return rollups
+
+    def save(self, path):
+        write_json_atomic(path, self.to_json())
+
+
+def load_rollups(path):
+    # Saved rollups, or None when missing, unreadable or from another version
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != ROLLUP_VERSION:
+            return None
+        return PurchaseRollups.from_json(data)
+    except:
+        return None
+
+
+def sync_rollups(rollups, purchase_history, total):
+    # Folds in the purchases recorded since `rollups` was saved. purchase_history
+    # is the hot window (newest first) of `total` purchases in all. Returns the
+    # number folded in, or None if the rollups do not line up with the history.
+    new = total - rollups.purchases
+    if new < 0 or new >= len(purchase_history):
+        return None if new else 0
+    if rollups.purchases and purchase_fingerprint(purchase_history[new]) != rollups.newest:
+        return None
+    for purchase in reversed(purchase_history[:new]):
+        rollups.record_purchase(purchase)
+    return new
@@ -0,0 +1,98 @@
+import argparse
+import json
+import random
+from datetime import date, timedelta
+
+from catalog import HEALTHIER_ALTERNATIVES, SHELF_LIFE, SHELF_LIFE_MATCHER
+from model import CATEGORIES
+
+# Synthetic Household Data
+# Produces grocery_data.json files in the app's schema with realistic names
+# (shelf-life and healthier-alternative catalog entries plus free-text
+# variants), the Add Item categories and expiry dates computed the way the
+# purchase handler does.
+CATEGORY_HINTS = {
+    'milk': 'Dairy', 'eggs': 'Dairy', 'yogurt': 'Dairy', 'cheese': 'Dairy', 'butter': 'Dairy', 'cream': 'Dairy',
+    'ice cream': 'Dairy', 'bread': 'Bakery', 'cookies': 'Bakery', 'rice': 'Grains', 'flour': 'Grains',
+    'pasta': 'Grains', 'sugar': 'Condiments', 'honey': 'Condiments', 'mayonnaise': 'Condiments',
+    'olive oil': 'Condiments', 'chips': 'Snacks', 'chocolate': 'Snacks', 'candy': 'Snacks', 'soda': 'Beverages',
+    'juice': 'Beverages', 'meat': 'Meat', 'chicken': 'Meat', 'fish': 'Meat', 'beef': 'Meat', 'bacon': 'Meat',
+    'bananas': 'Fruits', 'apples': 'Fruits', 'oranges': 'Fruits', 'tomatoes': 'Vegetables',
+    'onions': 'Vegetables', 'potatoes': 'Vegetables', 'spinach': 'Vegetables',
+}
+
+PREFIXES = ['', '', '', 'organic ', 'fresh ', 'large ', 'family pack ', 'local ']
+UNKNOWN_ITEMS = ['dish soap', 'paper towels', 'coffee', 'tea', 'cereal', 'peanut butter', 'lentils', 'tofu']
+
+
+def build_catalog(rng, size=200):
+    base = list(dict.fromkeys(list(SHELF_LIFE) + list(HEALTHIER_ALTERNATIVES) + UNKNOWN_ITEMS))
+    names = set(base)
+    while len(names) < size:
+        names.add(rng.choice(PREFIXES[3:]) + rng.choice(base))
+    catalog = []
+    for name in sorted(names):
+        key = SHELF_LIFE_MATCHER.match_key(name, contained_only=True) or name
+        category = CATEGORY_HINTS.get(key, rng.choice(CATEGORIES))
+        display = name.capitalize() if rng.random() < 0.5 else name
+        catalog.append((display, category))
+    return catalog
+
+
+def generate_state(lines, list_size=100, seed=0, today=None, days=730, catalog_size=200):
+    rng = random.Random(seed)
+    today = today or date.today()
+    catalog = build_catalog(rng, catalog_size)
+    # A household buys some staples far more often than the rest
+    weights = [1.0 / (rank + 1) for rank in range(len(catalog))]
+    history = []
+    remaining = lines
+    while remaining > 0:
+        count = min(remaining, rng.randint(1, 15))
+        remaining -= count
+        purchase_date = today - timedelta(days=rng.randrange(days))
+        items = []
+        for name, category in rng.choices(catalog, weights=weights, k=count):
+            life = SHELF_LIFE_MATCHER.lookup(name, contained_only=True)
+            items.append({
+                'name': name,
+                'category': category,
+                'quantity': rng.randint(1, 4),
+                'added_date': (purchase_date - timedelta(days=rng.randrange(3))).strftime('%Y-%m-%d'),
+                'expired_date': (purchase_date + timedelta(days=life)).strftime('%Y-%m-%d') if life else ""
+            })
+        history.append({'date': purchase_date.strftime('%Y-%m-%d'), 'items': items})
+    history.sort(key=lambda purchase: purchase['date'], reverse=True)
+    grocery_list = []
+    for index, (name, category) in enumerate(rng.choices(catalog, weights=weights, k=list_size)):
+        grocery_list.append({
+            'id': index + 1,
+            'name': name,
+            'category': category,
+            'quantity': rng.randint(1, 4),
+            'added_date': (today - timedelta(days=rng.randrange(30))).strftime('%Y-%m-%d'),
+            'purchased': rng.random() < 0.1
+        })
+    return {
+        'grocery_list': grocery_list,
+        'purchase_history': history,
+        'settings': {'auto_suggest': True}
+    }
+
+
+def write_dataset(path, lines, list_size=100, seed=0, today=None):
+    state = generate_state(lines, list_size=list_size, seed=seed, today=today)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    return state
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic grocery_data.json")
+    parser.add_argument('--lines', type=int, default=1000, help="purchase lines in the history")
+    parser.add_argument('--list-size', type=int, default=100, help="items on the current grocery list")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='grocery_data.json')
+    args = parser.parse_args()
+    write_dataset(args.out, args.lines, list_size=args.list_size, seed=args.seed)
+    print(f"Wrote {args.lines} purchase line(s) and {args.list_size} list item(s) to {args.out}")
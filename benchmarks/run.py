@@ -0,0 +1,207 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.generate import write_dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmark Runner
+# Times the app's hot functions (imported from main.py in Streamlit's bare
+# mode) and a full page render through AppTest on synthetic datasets of
+# increasing size, and writes latency percentiles and peak memory to JSON.
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def measure(fn, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    # Separate traced pass so tracemalloc overhead stays out of the timings
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'runs': repeat,
+        'mean_ms': round(sum(samples) / len(samples), 3),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p90_ms': round(percentile(samples, 90), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'max_ms': round(max(samples), 3),
+        'peak_mem_kb': round(peak / 1024, 1),
+    }
+
+
+def import_app():
+    import streamlit.logger
+    streamlit.logger.set_log_level('error')
+    import main
+    return main
+
+
+def bench_functions(app, data_path, repeat):
+    state = app.st.session_state
+
+    def reset_session():
+        state.pop('writer', None)
+        for key in app.HISTORY_DERIVED:
+            state.pop(key, None)
+
+    def reset_derived():
+        for key in app.HISTORY_DERIVED:
+            state.pop(key, None)
+
+    app.DATA_FILE = data_path
+    reset_session()
+    app.load_data()
+    cases = [
+        ('load_data (cold)', app.load_data, reset_session),
+        ('load_data (cached)', app.load_data, None),
+        ('predict_missing_items (cold)', app.predict_missing_items, reset_derived),
+        ('predict_missing_items', app.predict_missing_items, None),
+        ('get_expiring_items', app.get_expiring_items, None),
+        ('history_line_count (cold)', app.history_line_count, reset_derived),
+        ('get_history_page (cold)', lambda: app.get_history_page(0, 50), reset_derived),
+        ('get_history_page', lambda: app.get_history_page(0, 50), None),
+        ('suggest_healthier_alternatives', app.suggest_healthier_alternatives, None),
+    ]
+    results = {}
+    for name, fn, setup in cases:
+        # Warm-up call so one-off import and cache costs do not skew steady-state cases
+        if setup is None:
+            fn()
+        results[name] = measure(fn, repeat, setup)
+    return results
+
+
+def bench_render(workdir, repeat):
+    from streamlit.testing.v1 import AppTest
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        results = {}
+        holder = {}
+
+        def first_render():
+            holder['app'] = AppTest.from_file(os.path.join(ROOT, 'main.py'), default_timeout=600).run()
+
+        def rerun():
+            holder['app'].run()
+
+        results['render (first)'] = measure(first_render, repeat)
+        first_render()
+        results['render (rerun)'] = measure(rerun, repeat)
+        if holder['app'].exception:
+            raise RuntimeError(f"App raised during render: {holder['app'].exception[0].value}")
+        return results
+    finally:
+        os.chdir(cwd)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['lines'], r['function']): r for r in json.load(f)['results']}
+    print(f"{'lines':>9}  {'function':<32} {'base p50':>10} {'p50':>10} {'ratio':>7}")
+    for row in results:
+        old = baseline.get((row['lines'], row['function']))
+        if old is None or not old['p50_ms']:
+            continue
+        ratio = row['p50_ms'] / old['p50_ms']
+        print(f"{row['lines']:>9}  {row['function']:<32} {old['p50_ms']:>10.3f} {row['p50_ms']:>10.3f} {ratio:>6.2f}x")
+
+
+def run_sizes(args, workroot):
+    cwd = os.getcwd()
+    os.chdir(workroot)
+    app = import_app()
+    os.chdir(cwd)
+
+    results = []
+    for lines in [int(size) for size in args.sizes.split(',')]:
+        workdir = os.path.join(workroot, f"lines-{lines}")
+        # Start from the generated file alone (an old .db or journal would shadow it)
+        shutil.rmtree(workdir, ignore_errors=True)
+        os.makedirs(workdir)
+        data_path = os.path.join(workdir, 'grocery_data.json')
+        write_dataset(data_path, lines, list_size=args.list_size)
+        timings = bench_functions(app, data_path, args.repeat)
+        if not args.no_render:
+            timings.update(bench_render(workdir, args.render_repeat))
+        for function, stats in timings.items():
+            results.append(dict(lines=lines, function=function, **stats))
+            print(f"{lines:>9}  {function:<32} p50 {stats['p50_ms']:>10.3f} ms  p90 {stats['p90_ms']:>10.3f} ms  peak {stats['peak_mem_kb']:>10.1f} KiB")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the grocery assistant on synthetic data")
+    parser.add_argument('--sizes', default='10,1000,100000', help="comma-separated purchase line counts (up to 1000000)")
+    parser.add_argument('--list-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--render-repeat', type=int, default=5)
+    parser.add_argument('--no-render', action='store_true', help="skip the AppTest full-page render")
+    parser.add_argument('--backend', default=os.environ.get('GROCERY_STORAGE', 'json'))
+    parser.add_argument('--out', default='bench_results.json')
+    parser.add_argument('--compare', help="previous results file to compare p50 latencies against")
+    parser.add_argument('--workdir', help="directory for the generated datasets, kept afterwards "
+                                          "(default: a temporary directory, removed when done)")
+    args = parser.parse_args()
+
+    os.environ['GROCERY_STORAGE'] = args.backend
+    os.environ['GROCERY_SAVE_DELAY'] = '0'
+    # Measure the full generated history, not just the hot window
+    os.environ['GROCERY_HOT_DAYS'] = '0'
+    # No reminder thread writing sidecar files next to the data while timing
+    os.environ['GROCERY_REMINDERS'] = 'off'
+    if args.workdir:
+        workroot = os.path.abspath(args.workdir)
+        os.makedirs(workroot, exist_ok=True)
+    else:
+        workroot = tempfile.mkdtemp(prefix='grocery-bench-')
+    try:
+        results = run_sizes(args, workroot)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workroot, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': args.backend,
+            'list_size': args.list_size,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
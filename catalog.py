@@ -0,0 +1,130 @@
+from collections import deque
+from functools import lru_cache
+
+# Healthier Alternatives
+HEALTHIER_ALTERNATIVES = {
+    'white bread': {'alt': 'whole wheat bread', 'reason': 'Higher fiber, more nutrients, better for digestion'},
+    'white rice': {'alt': 'brown rice', 'reason': 'More fiber, vitamins, minerals, and protein'},
+    'soda': {'alt': 'sparkling water with lemon', 'reason': 'No added sugar, hydrating, natural flavor'},
+    'potato chips': {'alt': 'baked chips', 'reason': 'Lower fat content, more nutrients'},
+    'ice cream': {'alt': 'frozen yogurt', 'reason': 'Less fat, fewer calories, probiotics'},
+    'butter': {'alt': 'olive oil', 'reason': 'Healthier monounsaturated fats, antioxidants'},
+    'whole milk': {'alt': 'skim milk', 'reason': 'Lower fat, fewer calories, plant-based option'},
+    'beef': {'alt': 'lean chicken', 'reason': 'Lower saturated fat, more protein, omega-3s'},
+    'pasta': {'alt': 'whole wheat pasta', 'reason': 'More fiber, complex carbohydrates, lower calories'},
+    'mayonnaise': {'alt': 'Greek yogurt', 'reason': 'More protein, less fat, probiotics'},
+    'sugar': {'alt': 'honey', 'reason': 'Natural sweeteners, lower glycemic index'},
+    'cookies': {'alt': 'oatmeal cookies', 'reason': 'More fiber, less processed sugar, natural sweetness'},
+    'candy': {'alt': 'dark chocolate', 'reason': 'Antioxidants, natural sugars, fiber'},
+    'cream': {'alt': 'low-fat milk', 'reason': 'Lower fat content, plant-based option'},
+    'bacon': {'alt': 'turkey bacon', 'reason': 'Lower fat, less sodium, more protein'},
+    'juice': {'alt': 'fresh fruit', 'reason': 'More fiber, less sugar, natural hydration'},
+}
+
+# Shelf life in days
+SHELF_LIFE = {
+    'milk': 7, 'bread': 5, 'whole wheat bread': 7, 'eggs': 21, 'yogurt': 14, 'cheese': 30,
+    'rice': 180, 'flour': 180, 'pasta': 365, 'sugar': 365, 'honey': 365, 'cookies': 120,
+    'chips': 180, 'chocolate': 180, 'mayonnaise': 60, 'meat': 3, 'chicken': 3, 'fish': 2,
+    'beef': 3, 'bananas': 5, 'butter': 180, 'bacon': 7, 'juice': 7, 'olive oil': 365,
+    'tomatoes': 7, 'onions': 30, 'potatoes': 30, 'apples': 14, 'oranges': 14, 'spinach': 5,
+}
+
+DEFAULT_SHELF_LIFE = 30  # Default shelf life for unknown items
+
+
+def normalize_name(name):
+    return name.lower().strip()
+
+
+# Catalog Matcher
+# Matches an item name against catalog keys with the rule the app has always
+# used: a key matches if it is contained in the name or the name is contained
+# in the key, and the earliest key in catalog order wins. Keys contained in the
+# name are found with an Aho-Corasick automaton, names contained in a key with
+# a substring table, so a lookup costs O(len(name)) whatever the catalog size.
+class CatalogMatcher:
+    def __init__(self, catalog, cache_size=65536):
+        self.keys = list(catalog)
+        self.values = [catalog[key] for key in self.keys]
+        self._build_automaton()
+        self._build_substrings()
+        self._lookup = lru_cache(maxsize=cache_size)(self._match)
+
+    def _build_automaton(self):
+        goto = [{}]
+        best = [None]
+        for priority, key in enumerate(self.keys):
+            state = 0
+            for char in key:
+                if char not in goto[state]:
+                    goto.append({})
+                    best.append(None)
+                    goto[state][char] = len(goto) - 1
+                state = goto[state][char]
+            if best[state] is None:
+                best[state] = priority
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            inherited = best[fail[state]]
+            if inherited is not None and (best[state] is None or inherited < best[state]):
+                best[state] = inherited
+            for char, child in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[child] = goto[fallback].get(char, 0)
+                queue.append(child)
+        self._goto = goto
+        self._fail = fail
+        self._best = best
+
+    def _build_substrings(self):
+        substrings = {}
+        for priority, key in enumerate(self.keys):
+            for start in range(len(key) + 1):
+                for end in range(start, len(key) + 1):
+                    substrings.setdefault(key[start:end], priority)
+        self._substrings = substrings
+
+    def _keys_in(self, name):
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found = None
+        for char in name:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] is not None and (found is None or best[state] < found):
+                found = best[state]
+        return found
+
+    def _match(self, name, contained_only):
+        found = self._keys_in(name)
+        if not contained_only:
+            reverse = self._substrings.get(name)
+            if reverse is not None and (found is None or reverse < found):
+                found = reverse
+        return found
+
+    def match_key(self, name, contained_only=False):
+        priority = self._lookup(normalize_name(name), contained_only)
+        return None if priority is None else self.keys[priority]
+
+    def lookup(self, name, default=None, contained_only=False):
+        priority = self._lookup(normalize_name(name), contained_only)
+        return default if priority is None else self.values[priority]
+
+
+HEALTHIER_MATCHER = CatalogMatcher(HEALTHIER_ALTERNATIVES)
+SHELF_LIFE_MATCHER = CatalogMatcher(SHELF_LIFE)
+
+
+def get_healthier_alt(item_name):
+    return HEALTHIER_MATCHER.lookup(item_name)
+
+
+def get_shelf_life(item_name, default=DEFAULT_SHELF_LIFE):
+    return SHELF_LIFE_MATCHER.lookup(item_name, default)
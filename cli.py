@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import core
+from storage import household_stems
+
+# Batch Reports
+# Runs the expiry and replenishment logic over every household data file in a
+# directory without starting Streamlit, spread across a process pool, and
+# writes one JSON line per household and report:
+#   python cli.py households/ --workers 8 --out reports.jsonl
+
+
+def find_households(directory):
+    # Data paths as open_store() expects them: any household the app would
+    # list (a .json, .db or journal-only .json.journal file) is opened through
+    # its .json path with the chosen backend
+    return [os.path.join(directory, stem + '.json') for stem in household_stems(directory)]
+
+
+def household_reports(task):
+    path, backend, today = task
+    household = os.path.splitext(os.path.basename(path))[0]
+    base = {'household': household, 'path': path, 'date': today.isoformat()}
+    try:
+        state = core.load_data(path, backend)
+        return [
+            dict(base, report='expiry', items=core.get_expiring_items(state, today)),
+            dict(base, report='replenishment', items=core.predict_missing_items(state, today)),
+        ]
+    except Exception as e:
+        return [dict(base, report='error', error=str(e))]
+
+
+def run_reports(paths, backend='json', today=None, workers=None):
+    # Yields report lists in input order
+    today = today or date.today()
+    tasks = [(path, backend, today) for path in paths]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) <= 1:
+        yield from map(household_reports, tasks)
+        return
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(household_reports, tasks, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expiry and replenishment reports for a directory of households")
+    parser.add_argument('directory', help="directory of household data files")
+    parser.add_argument('--backend', default=os.environ.get('GROCERY_STORAGE', 'json'), choices=['json', 'journal', 'sqlite'])
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--today', type=date.fromisoformat, default=None, help="report date, YYYY-MM-DD")
+    parser.add_argument('--out', default='-', help="JSONL output file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    paths = find_households(args.directory)
+    out = sys.stdout if args.out == '-' else open(args.out, 'w', encoding='utf-8')
+    errors = 0
+    try:
+        for reports in run_reports(paths, args.backend, args.today, args.workers):
+            for report in reports:
+                errors += report['report'] == 'error'
+                out.write(json.dumps(report, ensure_ascii=False) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Processed {len(paths)} household(s), {errors} error(s)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
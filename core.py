@@ -0,0 +1,401 @@
+from copy import deepcopy
+from datetime import date, timedelta
+
+from analytics import PurchaseRollups, load_rollups, rollup_path, sync_rollups
+from catalog import DEFAULT_SHELF_LIFE, SHELF_LIFE_MATCHER, get_healthier_alt, normalize_name
+from history_archive import HistoryArchive
+from history_index import date_ordinal
+from model import compact_history
+from name_index import NameIndex, clean_name
+from replenishment import CATEGORY, INTERVAL, LAST, NAME, QUANTITY, CadenceModel
+from storage import apply_event, item_ref, new_item_id, open_store, purchases_for_item, write_json_atomic
+
+# Core Engine
+# The assistant's logic without Streamlit. Every function takes a state object
+# with grocery_list, purchase_history and settings attributes: a GroceryState
+# in scripts and batch jobs, st.session_state in the app. NumPy/pandas are only
+# imported by the functions that need them.
+
+PREDICTION_LIMIT = 10  # Replenishment suggestions shown at most
+
+# Expiry status thresholds (days until expiry)
+STATUSES = ('expired', 'urgent', 'warning', 'fresh')
+URGENT_DAYS = 4
+WARNING_DAYS = 6
+ALERT_DAYS = 8  # Only show alerts up to 8 days
+# Lists at least this long go through the vectorized engine in expiry.py
+BATCH_EXPIRY_THRESHOLD = 2000
+
+
+class GroceryState:
+    def __init__(self, grocery_list=None, purchase_history=None, settings=None):
+        self.grocery_list = grocery_list if grocery_list is not None else []
+        self.purchase_history = compact_history(purchase_history or [])
+        self.settings = {'auto_suggest': True}
+        self.settings.update(settings or {})
+        # Older purchases moved out of the data file (history_archive.py)
+        self.archive = None
+        # Derived structures, built on first use
+        self.cadence = None
+        self.history_frame = None
+        self.name_index = None
+        self.analytics = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('grocery_list', []), data.get('purchase_history', []), data.get('settings', {}))
+
+    def to_dict(self):
+        return {
+            'grocery_list': self.grocery_list,
+            'purchase_history': self.purchase_history,
+            'settings': self.settings
+        }
+
+
+def load_data(path, backend='json'):
+    state = GroceryState.from_dict(open_store(backend, path).load())
+    state.archive = HistoryArchive(path)
+    return state
+
+
+# Derived History Structures
+def get_cadence(state):
+    cadence = getattr(state, 'cadence', None)
+    if cadence is None:
+        cadence = state.cadence = CadenceModel.build(state.purchase_history)
+    return cadence
+
+
+def get_history_frame(state):
+    frame = getattr(state, 'history_frame', None)
+    if frame is None:
+        from history_frame import PurchaseHistoryFrame
+        frame = state.history_frame = PurchaseHistoryFrame(state.purchase_history)
+    return frame
+
+
+def get_name_index(state):
+    index = getattr(state, 'name_index', None)
+    if index is None:
+        archive = getattr(state, 'archive', None)
+        archived_items = archived_item_counts(archive) if archive is not None else ()
+        index = state.name_index = NameIndex.build(state.purchase_history, state.grocery_list, archived_items=archived_items)
+    return index
+
+
+def canonical_item_name(state, name):
+    # The spelling already used for this item (ignoring case, spacing and
+    # word order), or the cleaned-up input for a new one
+    name = clean_name(name)
+    return get_name_index(state).canonical(name) or name
+
+
+# Archived History
+# The session state only holds the hot window; these read the history
+# archive's segments on demand.
+def archived_item_counts(archive):
+    for _, summary in archive.segments():
+        yield from summary['items'].items()
+
+
+def history_line_count(state):
+    # Lines in the Purchase History table, counting archive segments not read yet
+    frame = get_history_frame(state)
+    archive = getattr(state, 'archive', None)
+    if archive is None:
+        return len(frame)
+    return len(frame) + sum(summary['lines'] for month, summary in archive.segments() if month not in frame.loaded_segments)
+
+
+def get_history_page(state, page, page_size=50):
+    # Zero-based page of the Purchase History table. Archive segments are
+    # merged into the history frame, newest month first, once a page needs them.
+    frame = get_history_frame(state)
+    archive = getattr(state, 'archive', None)
+    if archive is not None:
+        for month, _ in archive.segments():
+            if len(frame) >= (page + 1) * page_size:
+                break
+            if month not in frame.loaded_segments:
+                frame.add_purchases(archive.read_segment(month))
+                frame.loaded_segments.add(month)
+    return frame.page(page, page_size)
+
+
+def _dated_between(purchases, start, end):
+    return [purchase for purchase in purchases if start <= (purchase.get('date') or '') <= end]
+
+
+def search_history(state, name=None, start=None, end=None, store=None):
+    # Purchases of one item (only its lines kept) and/or within a date window
+    # (YYYY-MM-DD, inclusive), newest first, archive included. A store with
+    # indexed queries (SQLite) answers from its name and date indexes, and so
+    # sees what is committed; otherwise the session history is filtered.
+    start, end = start or '', end or '9999-12-31'
+    indexed = getattr(store, 'indexed', False)
+    if name:
+        hot = store.purchases_for_item(name) if indexed else purchases_for_item(state.purchase_history, name)
+        found = _dated_between(hot, start, end)
+    elif indexed:
+        found = store.purchases_between(start, end)
+    else:
+        found = _dated_between(state.purchase_history, start, end)
+    archive = getattr(state, 'archive', None)
+    if archive is not None:
+        key = normalize_name(name) if name else None
+        # Segment summaries rule out months outside the window or without the item
+        for month, summary in archive.segments():
+            if summary['last'] < start or summary['first'] > end:
+                continue
+            if key is not None and not any(normalize_name(item) == key for item in summary['items']):
+                continue
+            purchases = archive.read_segment(month)
+            if name:
+                purchases = purchases_for_item(purchases, name)
+            found.extend(_dated_between(purchases, start, end))
+    return found
+
+
+def all_purchases(state, oldest_first=False):
+    # The hot history and every archived purchase, newest first by default
+    archive = getattr(state, 'archive', None)
+    if oldest_first:
+        if archive is not None:
+            yield from archive.purchases(oldest_first=True)
+        yield from reversed(state.purchase_history)
+        return
+    yield from state.purchase_history
+    if archive is not None:
+        yield from archive.purchases()
+
+
+# Analytics Rollups
+# Loaded from the file saved next to the data file and brought up to date
+# with the purchases recorded since; rebuilt from the full history (archive
+# included) when there is no usable file.
+def get_analytics(state):
+    rollups = getattr(state, 'analytics', None)
+    if rollups is not None:
+        return rollups
+    archive = getattr(state, 'archive', None)
+    rollups = load_rollups(rollup_path(archive.path)) if archive is not None else None
+    total = len(state.purchase_history) + (archive.purchase_count() if archive is not None else 0)
+    folded = sync_rollups(rollups, state.purchase_history, total) if rollups is not None else None
+    if folded is None:
+        rollups = PurchaseRollups.build(all_purchases(state, oldest_first=True))
+    state.analytics = rollups
+    if folded != 0:
+        save_analytics(state)
+    return rollups
+
+
+def save_analytics(state):
+    archive = getattr(state, 'archive', None)
+    if archive is not None and getattr(state, 'analytics', None) is not None:
+        state.analytics.save(rollup_path(archive.path))
+
+
+def analytics_saver(state):
+    # A callable that saves the rollups as they are now (copied, so later
+    # purchases do not leak in), for running once the purchases they include
+    # are committed; None when there is nothing to save
+    archive = getattr(state, 'archive', None)
+    if archive is None or getattr(state, 'analytics', None) is None:
+        return None
+    path = rollup_path(archive.path)
+    data = deepcopy(state.analytics.to_json())
+    return lambda: write_json_atomic(path, data)
+
+
+def record_purchase(state, purchase):
+    # Keep already-built derived structures in step with a new purchase
+    if getattr(state, 'cadence', None) is not None:
+        state.cadence.record_purchase(purchase)
+    if getattr(state, 'history_frame', None) is not None:
+        state.history_frame.append_purchase(purchase)
+    if getattr(state, 'name_index', None) is not None:
+        for item in purchase['items']:
+            state.name_index.add(item['name'])
+    if getattr(state, 'analytics', None) is not None:
+        state.analytics.record_purchase(purchase)
+
+
+def apply_change(state, event):
+    # Apply a mutation event (see storage.apply_event) to a state object
+    data = {
+        'grocery_list': state.grocery_list,
+        'purchase_history': state.purchase_history,
+        'settings': state.settings
+    }
+    apply_event(data, event)
+    state.grocery_list = data['grocery_list']
+    if event['op'] == 'list_insert' and getattr(state, 'name_index', None) is not None:
+        state.name_index.add(event['item']['name'])
+    for purchase in event_purchases(event):
+        record_purchase(state, purchase)
+
+
+def event_purchases(event):
+    # Purchase records made by an event, including those inside batches
+    if event['op'] == 'batch':
+        for sub_event in event['events']:
+            yield from event_purchases(sub_event)
+    elif event['op'] == 'purchase':
+        yield event['record']
+
+
+# Healthier Alternatives
+def suggest_healthier_alternatives(state):
+    suggestions = []
+    for item in state.grocery_list:
+        alt = get_healthier_alt(item['name'])
+        if alt:
+            suggestions.append({
+                'current': item['name'],
+                'alternative': alt['alt'],
+                'reason': alt['reason'],
+                'item_id': item.get('id')
+            })
+    return suggestions
+
+
+# Missing Items Prediction
+def predict_missing_items(state, today=None, k=PREDICTION_LIMIT):
+    # Items not on the list that are due or overdue for their usual restock,
+    # most overdue first, then items bought once recently
+    if not state.settings.get('auto_suggest', True):
+        return []
+
+    current_items = {normalize_name(item['name']) for item in state.grocery_list}
+    today = today or date.today()
+    cadence = get_cadence(state)
+
+    suggestions = []
+    for ratio, entry in cadence.overdue(today.toordinal(), k, exclude=current_items):
+        days_since = today.toordinal() - entry[LAST]
+        every = round(entry[INTERVAL])
+        suggestions.append({
+            'item': entry[NAME],
+            'reason': f"You buy {entry[NAME]} about every {every} day(s) and last bought it {days_since} day(s) ago. Should I add it again?",
+            'category': entry[CATEGORY],
+            'quantity': max(1.0, float(round(entry[QUANTITY]))),
+            'overdue_days': days_since - every
+        })
+
+    # Items bought once fill the remaining slots, newest first
+    for entry in cadence.recent(today.toordinal(), k - len(suggestions), exclude=current_items):
+        days_since = today.toordinal() - entry[LAST]
+        suggestions.append({
+            'item': entry[NAME],
+            'reason': f"You bought {entry[NAME]} {days_since} day(s) ago. Should I add it again?",
+            'category': entry[CATEGORY],
+            'quantity': max(1.0, float(round(entry[QUANTITY]))),
+            'overdue_days': None
+        })
+
+    return suggestions
+
+
+# Expiring Items
+def expiry_status(days_until_expiry):
+    if days_until_expiry < 0:
+        return 'expired'
+    if days_until_expiry <= URGENT_DAYS:
+        return 'urgent'
+    if days_until_expiry <= WARNING_DAYS:
+        return 'warning'
+    return 'fresh'
+
+
+def reminder_message(name, status, days_until_expiry):
+    if status == 'expired':
+        return f"⚠️ {name} expired {abs(days_until_expiry)} day(s) ago!"
+    if status == 'urgent':
+        return f"🔴 {name} expires in {days_until_expiry} day(s)!"
+    if status == 'warning':
+        return f"🟡 {name} expires in {days_until_expiry} day(s)"
+    return None  # No alert for fresh items
+
+
+def get_expiring_items(state, today=None):
+    today = today or date.today()
+    grocery_list = state.grocery_list
+    if len(grocery_list) >= BATCH_EXPIRY_THRESHOLD:
+        from expiry import expiring_items
+        return expiring_items(grocery_list, today)
+
+    reminders = []
+    today_ordinal = today.toordinal()
+    for item in grocery_list:
+        try:
+            added = date_ordinal(item['added_date'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        item_life = SHELF_LIFE_MATCHER.lookup(item['name'], DEFAULT_SHELF_LIFE)
+        days_until_expiry = item_life - (today_ordinal - added)
+        status = expiry_status(days_until_expiry)
+        if status != 'fresh' and days_until_expiry <= ALERT_DAYS:
+            reminders.append({
+                'item': item['name'],
+                'status': status,
+                'message': reminder_message(item['name'], status, days_until_expiry)
+            })
+    return sorted(reminders, key=lambda x: STATUSES.index(x['status']))
+
+
+# Purchases
+def build_purchase_record(items, today=None):
+    today = today or date.today()
+    purchase_record = {
+        'date': today.strftime('%Y-%m-%d'),
+        'items': [
+            {
+                'name': i['name'],
+                'category': i['category'],
+                'quantity': i['quantity'],
+                'added_date': i.get('added_date', today.strftime('%Y-%m-%d')),
+                'expired_date': None
+            } for i in items
+        ]
+    }
+    # calculate expiry dates
+    for item_p in purchase_record['items']:
+        item_life = SHELF_LIFE_MATCHER.lookup(item_p['name'], contained_only=True)
+        if item_life:
+            item_p['expired_date'] = (today + timedelta(days=item_life)).strftime('%Y-%m-%d')
+        else:
+            item_p['expired_date'] = ""
+    return purchase_record
+
+
+def checkout_items(items, today=None):
+    # One purchase event for these list items (with any edits already applied),
+    # removing exactly them from the list by id
+    return {
+        'op': 'purchase',
+        'record': build_purchase_record(items, today),
+        'remove_ids': [item['id'] for item in items]
+    }
+
+
+def checkout_event(state, item_ids, today=None):
+    # Bulk checkout of the list items with these ids, in list order; None if none match
+    ids = set(item_ids)
+    items = [item for item in state.grocery_list if item.get('id') in ids]
+    return checkout_items(items, today) if items else None
+
+
+def assign_item_ids(grocery_list):
+    # Gives items with no id, or one already used earlier in the list, a fresh
+    # unique id in place; returns the list_update events that persist them
+    seen = set()
+    events = []
+    for index, item in enumerate(grocery_list):
+        item_id = item.get('id')
+        if item_id is None or item_id in seen:
+            target = item_ref(item)
+            item['id'] = item_id = new_item_id()
+            events.append({'op': 'list_update', 'index': index, 'target': target, 'fields': {'id': item_id}})
+        seen.add(item_id)
+    return events
@@ -0,0 +1,73 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from catalog import DEFAULT_SHELF_LIFE, SHELF_LIFE_MATCHER
+from core import ALERT_DAYS, STATUSES, URGENT_DAYS, WARNING_DAYS, reminder_message
+from history_index import date_ordinal
+
+# Expiry Engine
+# Batch version of the per-item expiry loop in core.py: dates become integer
+# day ordinals and days-until-expiry / status are computed as array operations.
+
+
+def _parse_ordinal(value):
+    try:
+        return date_ordinal(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def date_ordinals(values):
+    # Returns (ordinals, valid mask); unparseable or missing dates are invalid.
+    # Dates repeat heavily, so only the distinct strings are parsed.
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object))
+    parsed = np.array([_parse_ordinal(value) for value in uniques] + [0], dtype=np.int64)
+    ordinals = parsed[codes]
+    return ordinals, ordinals > 0
+
+
+def shelf_lives(names):
+    # One catalog lookup per distinct name
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object))
+    lives = np.array([SHELF_LIFE_MATCHER.lookup(name, DEFAULT_SHELF_LIFE) for name in uniques], dtype=np.int64)
+    return lives[codes]
+
+
+def status_codes(days_until_expiry):
+    # Index into STATUSES
+    return np.select(
+        [days_until_expiry < 0, days_until_expiry <= URGENT_DAYS, days_until_expiry <= WARNING_DAYS],
+        [0, 1, 2],
+        3,
+    )
+
+
+def _reminders(names, days_until_expiry, statuses, valid):
+    alert = valid & (statuses < 3) & (days_until_expiry <= ALERT_DAYS)
+    rows = np.flatnonzero(alert)
+    rows = rows[np.argsort(statuses[rows], kind='stable')]
+    reminders = []
+    for row in rows:
+        status = STATUSES[statuses[row]]
+        days = int(days_until_expiry[row])
+        reminders.append({
+            'item': names[row],
+            'status': status,
+            'message': reminder_message(names[row], status, days)
+        })
+    return reminders
+
+
+def expiring_items(grocery_list, today=None):
+    # Same result as the per-item loop: alerts for list items whose shelf life
+    # (counted from added_date) is over or ends within the alert window
+    if not grocery_list:
+        return []
+    today = today or date.today()
+    names = [item['name'] for item in grocery_list]
+    added, valid = date_ordinals([item.get('added_date') for item in grocery_list])
+    days_until_expiry = shelf_lives(names) - (today.toordinal() - added)
+    return _reminders(names, days_until_expiry, status_codes(days_until_expiry), valid)
+
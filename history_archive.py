@@ -0,0 +1,219 @@
+import argparse
+import gzip
+import json
+import os
+from collections import Counter
+from datetime import date
+
+import profiling
+from history_index import date_ordinal, purchase_day
+from model import compact_history, date_string
+from storage import file_signature, json_default, open_store, write_json_atomic
+
+# History Tiering
+# Purchases older than the hot window (HOT_DAYS) are moved out of the data
+# file into gzip-compressed JSON-lines segments, one per calendar month, under
+# <data file>.archive/. index.json lists every segment with a small summary
+# (date range, purchase and line counts, lines per item name), so archived
+# history can be counted and searched by name without opening a segment.
+# Segments are only read when the Purchase History table pages into them or
+# something needs the full history.
+#
+# A move writes each touched month to a new segment file, swaps in the new
+# index.json (the commit point), and then saves the data file without the
+# moved purchases. The index keeps the cutoff it archived up to; a purchase
+# older than that still in the data file is either left over from a move that
+# stopped before the save, or came back with a restored or merged data file.
+# It is only dropped when its month's segment already holds it.
+HOT_DAYS = 180  # Default for the command line; the app only tiers when GROCERY_HOT_DAYS is set
+INDEX_FILE = 'index.json'
+
+
+def month_key(ordinal):
+    return date_string(ordinal)[:7]
+
+
+def split_history(purchase_history, cutoff_ordinal):
+    # (hot, cold) in the original order; purchases without a readable date stay hot
+    hot, cold = [], []
+    for purchase in purchase_history:
+        try:
+            old = purchase_day(purchase) < cutoff_ordinal
+        except (KeyError, TypeError, ValueError):
+            old = False
+        (cold if old else hot).append(purchase)
+    return hot, cold
+
+
+def purchase_key(purchase):
+    # Identity of a purchase for matching against segment contents; quantities
+    # are compared as floats since SQLite hands them back that way
+    return (purchase.get('date'), tuple(
+        (line.get('name'), line.get('category'), float(line.get('quantity') or 0),
+         line.get('added_date'), line.get('expired_date'))
+        for line in purchase['items']))
+
+
+def summarize(purchases):
+    days = [purchase_day(purchase) for purchase in purchases]
+    items = {}
+    lines = 0
+    for purchase in purchases:
+        for line in purchase['items']:
+            items[line['name']] = items.get(line['name'], 0) + 1
+            lines += 1
+    return {
+        'first': date_string(min(days)),
+        'last': date_string(max(days)),
+        'purchases': len(purchases),
+        'lines': lines,
+        'items': items
+    }
+
+
+def _write_segment(path, purchases):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as f:
+            for purchase in purchases:
+                f.write((json.dumps(purchase, default=json_default, ensure_ascii=False) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+        profiling.count('bytes_written', raw.tell())
+    os.replace(tmp_path, path)
+
+
+class HistoryArchive:
+    def __init__(self, path):
+        self.path = path
+        self.directory = f"{path}.archive"
+        self.index_path = os.path.join(self.directory, INDEX_FILE)
+        self._index = None
+        self._signature = None
+
+    def index(self):
+        # index.json, re-read only when it changed on disk
+        signature = file_signature(self.index_path)
+        if self._index is None or signature != self._signature:
+            if signature is None:
+                self._index = {'cutoff': None, 'segments': {}}
+            else:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            self._signature = signature
+        return self._index
+
+    def cutoff(self):
+        # Purchases dated before this ordinal are archived (None: nothing is)
+        cutoff = self.index()['cutoff']
+        return date_ordinal(cutoff) if cutoff else None
+
+    def segments(self):
+        # (month, summary) pairs, newest month first
+        return sorted(self.index()['segments'].items(), reverse=True)
+
+    def purchase_count(self):
+        return sum(summary['purchases'] for summary in self.index()['segments'].values())
+
+    def line_count(self):
+        return sum(summary['lines'] for summary in self.index()['segments'].values())
+
+    @profiling.timed('read_segment')
+    def read_segment(self, month):
+        summary = self.index()['segments'][month]
+        with gzip.open(os.path.join(self.directory, summary['file']), 'rt', encoding='utf-8') as f:
+            return compact_history([json.loads(line) for line in f])
+
+    def purchases(self, oldest_first=False):
+        # Every archived purchase, newest first, reading one segment at a time
+        segments = self.segments()
+        if oldest_first:
+            for month, _ in reversed(segments):
+                yield from reversed(self.read_segment(month))
+        else:
+            for month, _ in segments:
+                yield from self.read_segment(month)
+
+    def not_archived(self, purchases):
+        # The purchases not already held by the archive. Only those dated before
+        # the cutoff can be, and each segment match is used up once, so genuine
+        # repeats of an archived purchase are kept.
+        cutoff = self.cutoff()
+        segments = self.index()['segments']
+        held = {}
+        kept = []
+        for purchase in purchases:
+            day = purchase_day(purchase)
+            month = month_key(day)
+            if cutoff is None or day >= cutoff or month not in segments:
+                kept.append(purchase)
+                continue
+            if month not in held:
+                held[month] = Counter(purchase_key(archived) for archived in self.read_segment(month))
+            key = purchase_key(purchase)
+            if held[month][key]:
+                held[month][key] -= 1
+            else:
+                kept.append(purchase)
+        return kept
+
+    def add(self, purchases, cutoff_ordinal):
+        # Merges purchases into their month segments. The caller holds the data
+        # file lock, which also guards the archive.
+        index = self.index()
+        by_month = {}
+        for purchase in purchases:
+            by_month.setdefault(month_key(purchase_day(purchase)), []).append(purchase)
+        os.makedirs(self.directory, exist_ok=True)
+        segments = dict(index['segments'])
+        replaced = []
+        for month, added in by_month.items():
+            previous = segments.get(month)
+            merged = added + (self.read_segment(month) if previous else [])
+            merged.sort(key=purchase_day, reverse=True)
+            generation = previous['generation'] + 1 if previous else 1
+            file_name = f"{month}.{generation}.jsonl.gz"
+            _write_segment(os.path.join(self.directory, file_name), merged)
+            segments[month] = dict(summarize(merged), file=file_name, generation=generation)
+            if previous:
+                replaced.append(previous['file'])
+        cutoff = max(cutoff_ordinal, self.cutoff() or 0)
+        write_json_atomic(self.index_path, {'cutoff': date_string(cutoff), 'segments': segments}, indent=2)
+        for file_name in replaced:
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+
+
+def archive_old_purchases(store, archive, cutoff_ordinal):
+    # Moves purchases dated before cutoff_ordinal from the store into the
+    # archive with a full save. Returns how many purchases left the store.
+    with store.lock():
+        state = store.load()
+        hot, cold = split_history(state['purchase_history'], cutoff_ordinal)
+        if not cold:
+            return 0
+        added = archive.not_archived(cold)
+        if added:
+            archive.add(added, cutoff_ordinal)
+        state['purchase_history'] = hot
+        store.save(state)
+        return len(cold)
+
+
+def hot_cutoff(hot_days, today=None):
+    return (today or date.today()).toordinal() - hot_days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old purchases of a grocery data file into the archive")
+    parser.add_argument('data', help="grocery data file (as passed to the app)")
+    parser.add_argument('--backend', default=os.environ.get('GROCERY_STORAGE', 'json'))
+    parser.add_argument('--days', type=int, default=int(os.environ.get('GROCERY_HOT_DAYS', HOT_DAYS)),
+                        help="days of purchases kept in the data file")
+    args = parser.parse_args()
+
+    archive = HistoryArchive(args.data)
+    moved = archive_old_purchases(open_store(args.backend, args.data), archive, hot_cutoff(args.days))
+    print(f"Archived {moved} purchase(s); {len(archive.segments())} segment(s), {archive.line_count()} line(s) in {archive.directory}")
@@ -0,0 +1,132 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from history_index import purchase_day
+from model import expired_day
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+NAT = np.iinfo(np.int64).min
+LATEST = np.iinfo(np.int64).max
+
+
+def _newest_first(days, rows):
+    # Stable sort of rows by day, newest first and undated (NAT) last. Negating
+    # NAT would overflow, so it is keyed past every real day instead.
+    keys = days[rows]
+    keys = np.where(keys == NAT, LATEST, -keys)
+    return rows[np.argsort(keys, kind='stable')]
+
+
+class _Dictionary:
+    # Interns strings to small integer codes for categorical columns
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def encode(self, values):
+        codes = self._codes
+        out = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(self.values)
+                self.values.append(value)
+            out[i] = code
+        return out
+
+
+# Columnar Purchase History
+# One typed array per column (codes for name/category, float quantities,
+# datetime64[D] dates) grown in place when a purchase is recorded. Row order
+# is kept newest first, with undated purchases last, and pages are built from
+# just the rows they show.
+class PurchaseHistoryFrame:
+    def __init__(self, purchase_history=()):
+        self._names = _Dictionary()
+        self._categories = _Dictionary()
+        self._size = 0
+        self._columns = {
+            'name': np.empty(0, dtype=np.int32),
+            'category': np.empty(0, dtype=np.int32),
+            'quantity': np.empty(0, dtype=np.float64),
+            'purchase_day': np.empty(0, dtype=np.int64),
+            'expired_day': np.empty(0, dtype=np.int64),
+        }
+        self._order = np.empty(0, dtype=np.int64)
+        # Archive months (history_archive.py) merged in so far
+        self.loaded_segments = set()
+        # History is newest-first; append it reversed so later purchases get higher rows
+        self._append(list(reversed(list(purchase_history))), rebuild_order=True)
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, extra):
+        needed = self._size + extra
+        capacity = len(self._columns['name'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 64)
+        for key, column in self._columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[key] = grown
+
+    def _append(self, purchases, rebuild_order=False):
+        names, categories, quantities, purchase_days, expired_days = [], [], [], [], []
+        for purchase in purchases:
+            try:
+                day = purchase_day(purchase)
+            except (KeyError, TypeError, ValueError):
+                day = None
+            for item in purchase['items']:
+                names.append(item['name'])
+                categories.append(item.get('category') or 'Other')
+                quantities.append(item.get('quantity') or 0)
+                purchase_days.append(day)
+                expired_days.append(expired_day(item))
+        count = len(names)
+        if count == 0:
+            return
+        self._grow(count)
+        start, end = self._size, self._size + count
+        columns = self._columns
+        columns['name'][start:end] = self._names.encode(names)
+        columns['category'][start:end] = self._categories.encode(categories)
+        columns['quantity'][start:end] = np.asarray(quantities, dtype=np.float64)
+        for key, values in (('purchase_day', purchase_days), ('expired_day', expired_days)):
+            columns[key][start:end] = [NAT if day is None else day - EPOCH_ORDINAL for day in values]
+        self._size = end
+        days = columns['purchase_day']
+        added = days[start:end]
+        # The first row in order has the newest valid day, unless none is dated
+        newest = days[self._order[0]] if start else NAT
+        if not rebuild_order and (added != NAT).all() and (newest == NAT or added.min() >= newest):
+            # Usual case: today's purchase sorts ahead of everything already stored
+            self._order = np.concatenate([_newest_first(days, np.arange(end - 1, start - 1, -1)), self._order])
+        else:
+            self._order = _newest_first(days, np.arange(end - 1, -1, -1))
+
+    def append_purchase(self, purchase):
+        self._append([purchase])
+
+    def add_purchases(self, purchases):
+        # Older purchases (newest-first), e.g. an archive segment
+        self._append(list(reversed(purchases)))
+
+    def _build(self, rows):
+        columns = self._columns
+        return pd.DataFrame({
+            "Item Name": pd.Categorical.from_codes(columns['name'][rows], self._names.values),
+            "Category": pd.Categorical.from_codes(columns['category'][rows], self._categories.values),
+            "Quantity": columns['quantity'][rows],
+            "Purchase Date": columns['purchase_day'][rows].view('datetime64[D]'),
+            "Expired Date": columns['expired_day'][rows].view('datetime64[D]'),
+        })
+
+    def page(self, page, page_size=50):
+        # Zero-based page of the newest-first view, built from just those rows
+        start = page * page_size
+        return self._build(self._order[start:start + page_size])
@@ -0,0 +1,16 @@
+from datetime import datetime
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8192)
+def date_ordinal(value):
+    # Purchase dates repeat a lot, so each distinct string is parsed once
+    return datetime.strptime(value, '%Y-%m-%d').toordinal()
+
+
+def purchase_day(purchase):
+    # Ordinal of purchase['date']; compact purchases (model.Purchase) carry it
+    # already. Raises like date_ordinal when the date is missing or malformed.
+    day = getattr(purchase, 'day', None)
+    return day if day is not None else date_ordinal(purchase['date'])
+
@@ -1,477 +1,660 @@
-import streamlit as st
-import pandas as pd
-from datetime import datetime, timedelta
-import json
-import os
-
-# Page Configuration
-st.set_page_config(
-    page_title="Smart Grocery Assistant",
-    page_icon="",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-st.markdown("""
-    <style>
-        #MainMenu {visibility: hidden;}     
-        footer {visibility: hidden;}       
-        header {visibility: hidden;}        
-
-        .block-container {
-            padding-top: 0.5rem !important;   
-        }  
-        .app-title {
-            font-size: 28px;      
-            font-weight: bold;
-            color: #2B6CB0;
-            margin-top: 0;        
-            margin-bottom: 5px;   
-        }
-        .app-subtitle {
-            font-size: 16px;
-            color: #4A5568;
-            margin-top: 0;
-            margin-bottom: 10px;
-        }
-    </style>
-""", unsafe_allow_html=True)
-
-# Initialize Session State
-if 'grocery_list' not in st.session_state:
-    st.session_state.grocery_list = []
-if 'purchase_history' not in st.session_state:
-    st.session_state.purchase_history = []
-if 'settings' not in st.session_state:
-    st.session_state.settings = {'auto_suggest': True}
-
-DATA_FILE = 'grocery_data.json'
-
-
-# Data Persistence
-def load_data():
-    if os.path.exists(DATA_FILE):
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                st.session_state.grocery_list = data.get('grocery_list', [])
-                st.session_state.purchase_history = data.get('purchase_history', [])
-                st.session_state.settings.update(data.get('settings', {}))
-        except Exception as e:
-            st.error(f"Error loading data: {e}")
-
-def save_data():
-    try:
-        data = {
-            'grocery_list': st.session_state.grocery_list,
-            'purchase_history': st.session_state.purchase_history,
-            'settings': st.session_state.settings
-        }
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, default=str, indent=2, ensure_ascii=False)
-    except Exception as e:
-        st.error(f"Error saving data: {e}")
-
-load_data()
-
-# Healthier Alternatives
-HEALTHIER_ALTERNATIVES = {
-    'white bread': {'alt': 'whole wheat bread', 'reason': 'Higher fiber, more nutrients, better for digestion'},
-    'white rice': {'alt': 'brown rice', 'reason': 'More fiber, vitamins, minerals, and protein'},
-    'soda': {'alt': 'sparkling water with lemon', 'reason': 'No added sugar, hydrating, natural flavor'},
-    'potato chips': {'alt': 'baked chips', 'reason': 'Lower fat content, more nutrients'},
-    'ice cream': {'alt': 'frozen yogurt', 'reason': 'Less fat, fewer calories, probiotics'},
-    'butter': {'alt': 'olive oil', 'reason': 'Healthier monounsaturated fats, antioxidants'},
-    'whole milk': {'alt': 'skim milk', 'reason': 'Lower fat, fewer calories, plant-based option'},
-    'beef': {'alt': 'lean chicken', 'reason': 'Lower saturated fat, more protein, omega-3s'},
-    'pasta': {'alt': 'whole wheat pasta', 'reason': 'More fiber, complex carbohydrates, lower calories'},
-    'mayonnaise': {'alt': 'Greek yogurt', 'reason': 'More protein, less fat, probiotics'},
-    'sugar': {'alt': 'honey', 'reason': 'Natural sweeteners, lower glycemic index'},
-    'cookies': {'alt': 'oatmeal cookies', 'reason': 'More fiber, less processed sugar, natural sweetness'},
-    'candy': {'alt': 'dark chocolate', 'reason': 'Antioxidants, natural sugars, fiber'},
-    'cream': {'alt': 'low-fat milk', 'reason': 'Lower fat content, plant-based option'},
-    'bacon': {'alt': 'turkey bacon', 'reason': 'Lower fat, less sodium, more protein'},
-    'juice': {'alt': 'fresh fruit', 'reason': 'More fiber, less sugar, natural hydration'},
-}
-
-def get_healthier_alt(item_name):
-    item_lower = item_name.lower().strip()
-    for key, value in HEALTHIER_ALTERNATIVES.items():
-        if key in item_lower or item_lower in key:
-            return value
-    return None
-
-def suggest_healthier_alternatives():
-    suggestions = []
-    for item in st.session_state.grocery_list:
-        alt = get_healthier_alt(item['name'])
-        if alt:
-            suggestions.append({
-                'current': item['name'],
-                'alternative': alt['alt'],
-                'reason': alt['reason'],
-                'item_id': item.get('id')
-            })
-    return suggestions
-
-# Missing Items Prediction
-def predict_missing_items():
-    if not st.session_state.settings.get('auto_suggest', True):
-        return []
-
-    suggestions = []
-    current_items = [item['name'].lower().strip() for item in st.session_state.grocery_list]
-
-    today = datetime.now().date()
-    cutoff_days = 20
-    cutoff = today - timedelta(days=cutoff_days)
-
-    # Track last purchase date and category
-    item_last_date = {}
-    item_categories = {}
-
-    for purchase in st.session_state.purchase_history:
-        try:
-            purchase_date = datetime.strptime(purchase['date'], '%Y-%m-%d').date()
-            if purchase_date >= cutoff:
-                for item in purchase['items']:
-                    name = item['name'].lower().strip()
-                    if name not in item_last_date or purchase_date > item_last_date[name]:
-                        item_last_date[name] = purchase_date
-                        item_categories[name] = item.get('category', 'Other')
-        except:
-            continue
-
-    # Suggest items not currently in grocery list
-    for name, last_date in item_last_date.items():
-        if name not in current_items:
-            days_since = (today - last_date).days
-            suggestions.append({
-                'item': name,
-                'reason': f"You bought {name} {days_since} day(s) ago. Should I add it again?",
-                'category': item_categories.get(name, 'Other')
-            })
-
-    return suggestions
-
-# Expiring Items
-def get_expiring_items():
-    reminders = []
-    today = datetime.now().date()
-
-    # Shelf life in days
-    shelf_life = {
-        'milk': 7, 'bread': 5, 'whole wheat bread': 7, 'eggs': 21, 'yogurt': 14, 'cheese': 30,
-        'rice': 180, 'flour': 180, 'pasta': 365, 'sugar': 365, 'honey': 365, 'cookies': 120,
-        'chips': 180, 'chocolate': 180, 'mayonnaise': 60, 'meat': 3, 'chicken': 3, 'fish': 2,
-        'beef': 3, 'bananas': 5, 'butter': 180, 'bacon': 7, 'juice': 7, 'olive oil': 365,
-        'tomatoes': 7, 'onions': 30, 'potatoes': 30, 'apples': 14, 'oranges': 14, 'spinach': 5,
-    }
-
-    default_life = 30  # Default shelf life for unknown items
-
-    for item in st.session_state.grocery_list:
-        try:
-            purchase_date = datetime.strptime(item['added_date'], '%Y-%m-%d').date()
-        except:
-            continue
-
-        item_name_lower = item['name'].lower().strip()
-        item_life = None
-
-        # Try to find shelf life key 
-        for key, life in shelf_life.items():
-            if key in item_name_lower or item_name_lower in key:
-                item_life = life
-                break
-
-        if item_life is None:
-            item_life = default_life
-
-        days_since_added = (today - purchase_date).days
-        days_until_expiry = item_life - days_since_added
-
-        # status logic
-        if days_until_expiry < 0:
-            status = 'expired'
-            message = f"⚠️ {item['name']} expired {abs(days_until_expiry)} day(s) ago!"
-        elif days_until_expiry <= 4:
-            status = 'urgent'
-            message = f"🔴 {item['name']} expires in {days_until_expiry} day(s)!"
-        elif days_until_expiry <= 6:
-            status = 'warning'
-            message = f"🟡 {item['name']} expires in {days_until_expiry} day(s)"
-        else:
-            status = 'fresh'
-            message = None  # No alert for fresh items
-
-        # Only show alerts up to 8 days
-        if status != 'fresh' and days_until_expiry <= 8:
-            reminders.append({
-                'item': item['name'],
-                'status': status,
-                'message': message
-            })
-
-    status_order = {'expired': 0, 'urgent': 1, 'warning': 2, 'fresh': 3}
-    reminders_sorted = sorted(reminders, key=lambda x: status_order.get(x['status'], 4))
-
-    return reminders_sorted
-
-# Purchase History DF
-def get_purchase_history_df():
-    rows = []
-    for purchase in st.session_state.purchase_history:
-        for item in purchase['items']:
-            rows.append({
-                "Item Name": item['name'],
-                "Category": item['category'],
-                "Quantity": item['quantity'],
-                "Purchase Date": purchase['date'],
-                "Expired Date": item.get('expired_date', "")
-            })
-    if rows:
-        return pd.DataFrame(rows)
-    return pd.DataFrame()
-
-st.markdown("""
-<style>
-.card {
-    padding: 18px;
-    border-radius: 14px;
-    background-color: #ffffff;
-    box-shadow: 0 6px 18px rgba(0,0,0,0.06);
-    margin-bottom: 18px;
-}
-.grocery-row {
-    padding: 10px;
-    border-radius: 10px;
-    background-color: #fbfcfd;
-    border: 1px solid #eef1f5;
-    margin-bottom: 10px;
-    display: flex;
-    align-items: center;
-}
-.grocery-name {
-    font-weight: 600;
-    font-size: 15px;
-}
-.grocery-meta {
-    color: #666;
-    font-size: 13px;
-}
-.small-btn {
-    padding: 6px 12px;
-    border-radius: 8px;
-}
-</style>
-""", unsafe_allow_html=True)
-
-# Main App
-def main():
-  
-    # App Title
-    st.markdown('<div class="app-title">Smart Grocery Shopping Assistant</div>', unsafe_allow_html=True)
-    st.markdown('<div class="app-subtitle">AI-powered assistant that predicts missing items, suggests healthier alternatives, and reminds you about expiring products</div>', unsafe_allow_html=True)
-
-    # Add Item & Grocery List
-    row1_col1, row1_col2 = st.columns([1, 2])
-
-    # Add Item
-    with row1_col1:
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h3 style="color:#38A169;">Add Item</h3>', unsafe_allow_html=True)
-        with st.form("add_item", clear_on_submit=True):
-            item_name = st.text_input("Item Name", placeholder="e.g., Milk, Bread, Eggs")
-            category = st.selectbox(
-                "Category",
-                ["Dairy", "Fruits", "Vegetables", "Meat", "Bakery", "Beverages", "Snacks", "Grains", "Condiments", "Other"]
-            )
-            quantity = st.number_input("Quantity", min_value=1, value=1, step=1, format="%d")
-            submit = st.form_submit_button("Add to List", key="add_item")
-        if submit:
-            if item_name.strip():
-                new_item = {
-                    'id': len(st.session_state.grocery_list) + 1,
-                    'name': item_name.strip(),
-                    'category': category,
-                    'quantity': quantity,
-                    'added_date': datetime.now().strftime('%Y-%m-%d'),
-                    'purchased': False
-                }
-                st.session_state.grocery_list.insert(0, new_item)  
-                save_data()
-                st.success(f" Added {item_name}!")
-            else:
-                st.error("Please enter an item name!")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    # Grocery List
-    with row1_col2:
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h3 style="color:#DD6B20;"> Current Grocery List</h3>', unsafe_allow_html=True)
-        if st.session_state.grocery_list:
-            col_labels = st.columns([0.5, 4, 1, 1, 1])
-            col_labels[0].markdown("****")
-            col_labels[1].markdown("**Item**")
-            col_labels[2].markdown("**Qty**")
-            col_labels[3].markdown("**Add**")
-            col_labels[4].markdown("**Remove**")
-
-            for idx, item in enumerate(st.session_state.grocery_list):
-                unique_key = f"{idx}_{item.get('id', idx)}"
-                col1, col2, col3, col4, col5 = st.columns([0.5, 4, 1, 1, 1])
-                with col1:
-                    purchased = st.checkbox("", value=item.get('purchased', False), key=f"cb_{unique_key}", label_visibility="collapsed")
-                    if purchased != item.get('purchased', False):
-                        st.session_state.grocery_list[idx]['purchased'] = purchased
-                        save_data()
-                        st.rerun()
-                with col2:
-                    quantity_display = str(int(item['quantity']))
-                    st.markdown(f"<div class='grocery-row'><div style='flex:1'><div class='grocery-name'>{item['name']}</div><div class='grocery-meta'>{item['category']}</div></div></div>", unsafe_allow_html=True)
-                    alt = get_healthier_alt(item['name'])
-                    if alt:
-                        st.markdown(f"<p style='color:#38A169;'>Healthier option: {alt['alt']} — {alt['reason']}</p>", unsafe_allow_html=True)
-                with col3:
-                    st.write(quantity_display)
-                with col4:
-                    if st.button("Add", key=f"purchase_{unique_key}", use_container_width=True):
-                        checked_items = [i for i in st.session_state.grocery_list if i.get('purchased', False)]
-                        to_purchase = checked_items if checked_items else [item]
-                        if to_purchase:
-                            purchase_record = {
-                                'date': datetime.now().strftime('%Y-%m-%d'),
-                                'items': [
-                                    {
-                                        'name': i['name'],
-                                        'category': i['category'],
-                                        'quantity': i['quantity'],
-                                        'added_date': i.get('added_date', datetime.now().strftime('%Y-%m-%d')),
-                                        'expired_date': None
-                                    } for i in to_purchase
-                                ]
-                            }
-                            # calculate expiry dates
-                            shelf_life = {
-                                'milk': 7, 'bread': 5, 'whole wheat bread': 7, 'eggs': 21, 'yogurt': 14, 'cheese': 30,
-                                'rice': 180, 'flour': 180, 'pasta': 365, 'sugar': 365, 'honey': 365, 'cookies': 120,
-                                'chips': 180, 'chocolate': 180, 'mayonnaise': 60, 'meat': 3, 'chicken': 3, 'fish': 2,
-                                'beef': 3, 'bananas': 5, 'butter': 180, 'bacon': 7, 'juice': 7, 'olive oil': 365,
-                                'tomatoes': 7, 'onions': 30, 'potatoes': 30, 'apples': 14, 'oranges': 14, 'spinach': 5,
-                            }
-                            for item_p in purchase_record['items']:
-                                item_name_lower = item_p['name'].lower()
-                                item_life = None
-                                for key, life in shelf_life.items():
-                                    if key in item_name_lower:
-                                        item_life = life
-                                        break
-                                if item_life:
-                                    item_p['expired_date'] = (datetime.now() + timedelta(days=item_life)).strftime('%Y-%m-%d')
-                                else:
-                                    item_p['expired_date'] = ""
-                            st.session_state.purchase_history.insert(0, purchase_record) 
-                            to_purchase_names = set([i['name'] for i in to_purchase])
-                            st.session_state.grocery_list = [i for i in st.session_state.grocery_list if i['name'] not in to_purchase_names]
-                            save_data()
-                            st.success(f"Purchased {len(purchase_record['items'])} item(s)!")
-                            st.rerun()
-                with col5:
-                    if st.button("Remove", key=f"del_{unique_key}", use_container_width=True):
-
-                        try:
-                            st.session_state.grocery_list.pop(idx)
-                            save_data()
-                            st.success(f"Removed {item['name']}")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Could not remove item: {e}")
-        else:
-            st.info("Your grocery list is empty. Add items above!")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    # Suggestions / Expiring
-    row2_col1, row2_col2, row2_col3 = st.columns([1,1,1])
-
-    # Healthier Alternatives
-    with row2_col1:
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h4 style="color:#38A169;">Healthier Alternatives</h4>', unsafe_allow_html=True)
-        healthier_suggestions = suggest_healthier_alternatives()
-        if healthier_suggestions:
-            for sug_idx, sug in enumerate(healthier_suggestions):
-                with st.expander(f"Replace '{sug['current']}' with '{sug['alternative']}'"):
-                    st.markdown(f"<p style='color:#3182CE;'>Reason: {sug['reason']}</p>", unsafe_allow_html=True)
-                    if st.button("Replace", key=f"rep_{sug_idx}_{sug['item_id']}", use_container_width=True):
-                        for item in st.session_state.grocery_list:
-                            if item.get('id') == sug['item_id']:
-                                item['name'] = sug['alternative']
-                                save_data()
-                                st.success(f"Replaced with {sug['alternative']}!")
-                                st.rerun()
-        else:
-            st.info("No unhealthy items detected.")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    # AI Missing Items
-    with row2_col2:
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h4 style="color:#3182CE;">AI Missing Items</h4>', unsafe_allow_html=True)
-        
-        # Only predict missing items if grocery list is not empty
-        if st.session_state.grocery_list:
-            missing_items = predict_missing_items()
-            # Filter out items already in the grocery list
-            current_items = [item['name'].lower().strip() for item in st.session_state.grocery_list]
-            missing_items = [item for item in missing_items if item['item'].lower().strip() not in current_items]
-            
-            if missing_items:
-                for sug_idx, sug in enumerate(missing_items):
-                    with st.expander(f"{sug['item']}"):
-                        st.markdown(f"<p style='color:#4A5568;'>Reason: {sug['reason']}</p>", unsafe_allow_html=True)
-                        if st.button("Add", key=f"add_missing_{sug_idx}", use_container_width=True):
-                            new_item = {
-                                'id': len(st.session_state.grocery_list) + 1,
-                                'name': sug['item'],
-                                'category': sug.get('category', 'Other'),
-                                'quantity': 1.0,
-                                'added_date': datetime.now().strftime('%Y-%m-%d'),
-                                'purchased': False
-                            }
-                            st.session_state.grocery_list.append(new_item)
-                            save_data()
-                            st.success(f"Added {sug['item']} to your list!")
-                            st.rerun()
-            else:
-                st.info("No missing item suggestions now.")
-        else:
-            st.info("Your grocery list is empty. Add items to see AI suggestions.")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-
-
-    # Expiring Items
-    with row2_col3:
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h4 style="color:#DD6B20;">Expiring Items</h4>', unsafe_allow_html=True)
-        exp_items = get_expiring_items()
-        if exp_items:
-            for item_m in exp_items:
-                st.markdown(f"<p style='color:#E53E3E;'>{item_m['message'] if isinstance(item_m, dict) else item_m}</p>", unsafe_allow_html=True)
-        else:
-            st.info(" No items expiring soon.")
-        st.markdown('</div>', unsafe_allow_html=True)
-
-    
-    # Purchase History
-    st.markdown('<div class="card">', unsafe_allow_html=True)
-    st.markdown('<h3 style="color:#718096;"> Purchase History</h3>', unsafe_allow_html=True)
-    ph_df = get_purchase_history_df()
-    if not ph_df.empty:
-        st.dataframe(ph_df.sort_values(by="Purchase Date", ascending=False))
-    else:
-        st.info(" No purchase history yet.")
-    st.markdown('</div>', unsafe_allow_html=True)
-
-if __name__ == "__main__":
-    main()
+import streamlit as st
+import pandas as pd
+from datetime import datetime, timedelta
+import os
+
+import core
+import profiling
+from catalog import get_healthier_alt
+from history_archive import HistoryArchive, archive_old_purchases, hot_cutoff, split_history
+from history_frame import PurchaseHistoryFrame
+from model import CATEGORIES, compact_history
+from name_index import clean_name
+from reminders import ReminderScheduler, open_sink
+from storage import DebouncedWriter, household_path, household_slug, list_households, item_ref, new_item_id, open_store
+
+profiling.start_rerun()
+
+# Page Configuration
+st.set_page_config(
+    page_title="Smart Grocery Assistant",
+    page_icon="",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+st.markdown("""
+    <style>
+        #MainMenu {visibility: hidden;}     
+        footer {visibility: hidden;}       
+        header {visibility: hidden;}        
+
+        .block-container {
+            padding-top: 0.5rem !important;   
+        }  
+        .app-title {
+            font-size: 28px;      
+            font-weight: bold;
+            color: #2B6CB0;
+            margin-top: 0;        
+            margin-bottom: 5px;   
+        }
+        .app-subtitle {
+            font-size: 16px;
+            color: #4A5568;
+            margin-top: 0;
+            margin-bottom: 10px;
+        }
+    </style>
+""", unsafe_allow_html=True)
+
+# Initialize Session State
+if 'grocery_list' not in st.session_state:
+    st.session_state.grocery_list = []
+if 'purchase_history' not in st.session_state:
+    st.session_state.purchase_history = []
+if 'settings' not in st.session_state:
+    st.session_state.settings = {'auto_suggest': True}
+if 'load_stats' not in st.session_state:
+    st.session_state.load_stats = {'hits': 0, 'misses': 0}
+
+DATA_FILE = 'grocery_data.json'
+HOUSEHOLDS_DIR = 'households'
+# 'json' rewrites the whole file on every save, 'journal' appends one event per change,
+# 'sqlite' keeps an indexed grocery_data.db (migrated from the JSON file on first use)
+STORAGE_BACKEND = os.environ.get('GROCERY_STORAGE', 'json')
+# Changes made within this many seconds of each other are written together
+SAVE_DELAY = float(os.environ.get('GROCERY_SAVE_DELAY', '0.5'))
+# Expiry reminders are sent from a background thread to 'file' (next to the data
+# file), 'file:<path>', 'webhook:<url>', or nowhere with 'off'
+REMINDER_SINK = os.environ.get('GROCERY_REMINDERS', 'file')
+# Set to a number of days (e.g. 180) to move older purchases into compressed monthly
+# segments next to the data file, read only when the history table pages into them.
+# Off (0) by default: everything stays in the data file.
+HISTORY_HOT_DAYS = int(os.environ.get('GROCERY_HOT_DAYS', '0'))
+
+if 'household' not in st.session_state:
+    st.session_state.household = household_slug(st.query_params.get('household', 'default'))
+
+
+@st.cache_resource
+def get_store(path):
+    # One store object per data file, shared by every session in this process
+    return open_store(STORAGE_BACKEND, path)
+
+def current_store():
+    return get_store(household_path(st.session_state.household, DATA_FILE, HOUSEHOLDS_DIR))
+
+@st.cache_resource
+def get_archive(path):
+    return HistoryArchive(path)
+
+def current_archive():
+    return get_archive(household_path(st.session_state.household, DATA_FILE, HOUSEHOLDS_DIR))
+
+def get_writer():
+    store = current_store()
+    writer = st.session_state.get('writer')
+    if writer is None or writer.store is not store:
+        writer = st.session_state.writer = DebouncedWriter(store, delay=SAVE_DELAY)
+    return writer
+
+@st.cache_resource
+def get_scheduler(path, household):
+    # One reminder scheduler per data file; it reads committed purchases from the store
+    sink = open_sink(REMINDER_SINK, path)
+    if sink is None:
+        return None
+    return ReminderScheduler(get_store(path), sink, f"{path}.reminders.json", context={'household': household}).start()
+
+def current_scheduler():
+    try:
+        path = household_path(st.session_state.household, DATA_FILE, HOUSEHOLDS_DIR)
+        return get_scheduler(path, st.session_state.household)
+    except Exception as e:
+        st.error(f"Error starting reminders: {e}")
+
+
+# Data Persistence
+# load_data() runs on every rerun; it only re-reads the store when its version
+# (file mtime/size, journal size or SQLite change counters) moved since the
+# last load or save in this session. Saves go through the session's debounced
+# writer, which checks that version before writing and rebases onto (or
+# rejects against) changes made by other sessions.
+@profiling.timed('load_data')
+def load_data():
+    st.session_state.archive = current_archive()
+    try:
+        writer = get_writer()
+        for level, message in writer.take_notices():
+            getattr(st, level)(message)
+        version = writer.store.version()
+        # Unflushed changes mean this session is ahead of the store
+        if writer.pending or (version is not None and not writer.needs_reload and writer.version == version):
+            st.session_state.load_stats['hits'] += 1
+            return
+        st.session_state.load_stats['misses'] += 1
+        data = writer.store.load()
+        if HISTORY_HOT_DAYS > 0:
+            cutoff = hot_cutoff(HISTORY_HOT_DAYS)
+            if split_history(data['purchase_history'], cutoff)[1]:
+                # Move purchases that left the hot window into the archive, then load what remains
+                try:
+                    archive_old_purchases(writer.store, st.session_state.archive, cutoff)
+                    version = writer.store.version()
+                    data = writer.store.load()
+                except Exception as e:
+                    st.warning(f"Old purchases were not archived: {e}")
+        st.session_state.grocery_list = data.get('grocery_list', [])
+        st.session_state.purchase_history = compact_history(data.get('purchase_history', []))
+        st.session_state.settings.update(data.get('settings', {}))
+        writer.loaded(version)
+        # Derived history structures are rebuilt lazily from the freshly loaded history
+        for key in HISTORY_DERIVED:
+            st.session_state.pop(key, None)
+        # Older data files numbered items len(list) + 1, which repeats after removals
+        id_fixes = core.assign_item_ids(st.session_state.grocery_list)
+        if id_fixes:
+            save_data({'op': 'batch', 'events': id_fixes})
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+
+@profiling.timed('save_data')
+def save_data(event=None, on_commit=None):
+    try:
+        data = {
+            'grocery_list': st.session_state.grocery_list,
+            'purchase_history': st.session_state.purchase_history,
+            'settings': st.session_state.settings
+        }
+        get_writer().submit(data, event, on_commit)
+    except Exception as e:
+        st.error(f"Error saving data: {e}")
+
+# Households
+def switch_household(name):
+    get_writer().flush()
+    st.session_state.household = household_slug(name)
+    st.session_state.pop('writer', None)
+    st.query_params['household'] = st.session_state.household
+
+def on_household_selected():
+    switch_household(st.session_state.household_select)
+
+def on_household_created():
+    name = st.session_state.new_household.strip()
+    st.session_state.new_household = ''
+    if name:
+        switch_household(name)
+
+# Derived History Structures
+HISTORY_DERIVED = ('cadence', 'history_frame', 'name_index', 'analytics')
+
+@profiling.timed('get_analytics')
+def get_analytics():
+    return core.get_analytics(st.session_state)
+
+@profiling.timed('history_line_count')
+def history_line_count():
+    return core.history_line_count(st.session_state)
+
+@profiling.timed('get_history_page')
+def get_history_page(page, page_size):
+    return core.get_history_page(st.session_state, page, page_size)
+
+@profiling.timed('search_history')
+def search_history(name, start):
+    return core.search_history(st.session_state, name, start, store=current_store())
+
+def get_name_index():
+    return core.get_name_index(st.session_state)
+
+load_data()
+current_scheduler()
+
+# App Logic
+# Thin wrappers over core.py, which holds the Streamlit-free implementations
+def suggest_healthier_alternatives():
+    return core.suggest_healthier_alternatives(st.session_state)
+
+@profiling.timed('predict_missing_items')
+def predict_missing_items():
+    return core.predict_missing_items(st.session_state)
+
+@profiling.timed('get_expiring_items')
+def get_expiring_items():
+    return core.get_expiring_items(st.session_state)
+
+st.markdown("""
+<style>
+.card {
+    padding: 18px;
+    border-radius: 14px;
+    background-color: #ffffff;
+    box-shadow: 0 6px 18px rgba(0,0,0,0.06);
+    margin-bottom: 18px;
+}
+.grocery-row {
+    padding: 10px;
+    border-radius: 10px;
+    background-color: #fbfcfd;
+    border: 1px solid #eef1f5;
+    margin-bottom: 10px;
+    display: flex;
+    align-items: center;
+}
+.grocery-name {
+    font-weight: 600;
+    font-size: 15px;
+}
+.grocery-meta {
+    color: #666;
+    font-size: 13px;
+}
+.small-btn {
+    padding: 6px 12px;
+    border-radius: 8px;
+}
+</style>
+""", unsafe_allow_html=True)
+
+# Purchases
+def commit_event(event):
+    # Apply an event to the session state, update derived history structures and persist it
+    core.apply_change(st.session_state, event)
+    # The analytics rollups are saved only once the purchase is committed, so
+    # the file never counts a purchase the store rejected
+    on_commit = None
+    if any(core.event_purchases(event)):
+        on_commit = core.analytics_saver(st.session_state)
+    save_data(event, on_commit)
+
+def checkout(item_ids):
+    # Bulk checkout: one purchase record, one removal by id, one write
+    event = core.checkout_event(st.session_state, item_ids)
+    if event is not None:
+        commit_event(event)
+    return event
+
+def on_item_checked(idx, key):
+    # Runs before the rerun the click triggers; the debounced writer coalesces a burst of ticks
+    item = st.session_state.grocery_list[idx]
+    item['purchased'] = st.session_state[key]
+    save_data({'op': 'list_update', 'index': idx, 'target': item_ref(item), 'fields': {'purchased': item['purchased']}})
+
+# Add Item
+# The name field commits as the user types and offers known names from the
+# name index. It runs as a fragment so typing only reruns this card; adding an
+# item reruns the whole app to show it in the list.
+def on_suggestion_picked():
+    if st.session_state.item_suggestion:
+        st.session_state.item_query = st.session_state.item_suggestion
+    st.session_state.item_suggestion = None
+
+def on_add_item():
+    name = clean_name(st.session_state.item_query)
+    if not name:
+        st.session_state.add_item_notice = ('error', "Please enter an item name!")
+        return
+    # "white Rice " or "rice white" joins an existing "White rice"
+    name = core.canonical_item_name(st.session_state, name)
+    new_item = {
+        'id': new_item_id(),
+        'name': name,
+        'category': st.session_state.add_category,
+        'quantity': st.session_state.add_quantity,
+        'added_date': datetime.now().strftime('%Y-%m-%d'),
+        'purchased': False
+    }
+    commit_event({'op': 'list_insert', 'index': 0, 'item': new_item})
+    st.session_state.item_query = ''
+    st.session_state.add_item_notice = ('success', f" Added {name}!")
+
+@st.fragment
+def render_add_item():
+    query = st.text_input("Item Name", key="item_query", placeholder="e.g., Milk, Bread, Eggs", live=True)
+    with profiling.span('suggest_names'):
+        suggestions = get_name_index().suggest(query) if query.strip() else []
+    if suggestions and suggestions != [clean_name(query)]:
+        st.pills("Suggestions", suggestions, key="item_suggestion", on_change=on_suggestion_picked, label_visibility="collapsed")
+    with st.form("add_item", clear_on_submit=True):
+        st.selectbox("Category", CATEGORIES, key="add_category")
+        st.number_input("Quantity", min_value=1, value=1, step=1, format="%d", key="add_quantity")
+        submitted = st.form_submit_button("Add to List", key="add_item", on_click=on_add_item)
+    if submitted:
+        st.rerun()
+    notice = st.session_state.pop('add_item_notice', None)
+    if notice:
+        getattr(st, notice[0])(notice[1])
+
+# Grocery List Views
+LIST_ROWS_LIMIT = 50  # Larger lists default to the table view
+HISTORY_PERIODS = {'All time': 0, 'Last 30 days': 30, 'Last 90 days': 90, 'Last 365 days': 365}
+
+@profiling.timed('render_list_rows')
+def render_list_rows():
+    col_labels = st.columns([0.5, 4, 1, 1, 1])
+    col_labels[0].markdown("****")
+    col_labels[1].markdown("**Item**")
+    col_labels[2].markdown("**Qty**")
+    col_labels[3].markdown("**Add**")
+    col_labels[4].markdown("**Remove**")
+
+    for idx, item in enumerate(st.session_state.grocery_list):
+        unique_key = f"{idx}_{item.get('id', idx)}"
+        col1, col2, col3, col4, col5 = st.columns([0.5, 4, 1, 1, 1])
+        with col1:
+            st.checkbox("", value=item.get('purchased', False), key=f"cb_{unique_key}", label_visibility="collapsed",
+                        on_change=on_item_checked, args=(idx, f"cb_{unique_key}"))
+        with col2:
+            quantity_display = str(int(item['quantity']))
+            st.markdown(f"<div class='grocery-row'><div style='flex:1'><div class='grocery-name'>{item['name']}</div><div class='grocery-meta'>{item['category']}</div></div></div>", unsafe_allow_html=True)
+            alt = get_healthier_alt(item['name'])
+            if alt:
+                st.markdown(f"<p style='color:#38A169;'>Healthier option: {alt['alt']} — {alt['reason']}</p>", unsafe_allow_html=True)
+        with col3:
+            st.write(quantity_display)
+        with col4:
+            if st.button("Add", key=f"purchase_{unique_key}", use_container_width=True):
+                checked_ids = [i['id'] for i in st.session_state.grocery_list if i.get('purchased', False)]
+                event = checkout(checked_ids or [item['id']])
+                if event is not None:
+                    st.success(f"Purchased {len(event['record']['items'])} item(s)!")
+                    st.rerun()
+        with col5:
+            if st.button("Remove", key=f"del_{unique_key}", use_container_width=True):
+
+                try:
+                    st.session_state.grocery_list.pop(idx)
+                    save_data({'op': 'list_pop', 'index': idx, 'target': item_ref(item)})
+                    st.success(f"Removed {item['name']}")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Could not remove item: {e}")
+
+@profiling.timed('render_list_table')
+def render_list_table():
+    # One editable table; edits are only committed when a form button is pressed
+    grocery_list = st.session_state.grocery_list
+    query = st.text_input("Search", key="list_search", placeholder="Filter items").lower().strip()
+    rows = [item for item in grocery_list if query in item['name'].lower()]
+    table = pd.DataFrame({
+        'Purchased': [bool(item.get('purchased', False)) for item in rows],
+        'Item': [item['name'] for item in rows],
+        'Category': [item['category'] for item in rows],
+        'Qty': [int(item['quantity']) for item in rows],
+        'Remove': [False] * len(rows),
+    }, index=pd.Index([item['id'] for item in rows], name='id'))
+    # The editor keeps its edits by row position, so its key changes with the
+    # rows shown; edits made against another list or filter are dropped
+    shown = hash(tuple((item['id'], item['name'], item['category'], item['quantity'], bool(item.get('purchased', False))) for item in rows))
+    with st.form("bulk_edit"):
+        edited = st.data_editor(
+            table,
+            key=f"list_editor_{shown}",
+            hide_index=True,
+            height=420,
+            use_container_width=True,
+            disabled=['Item', 'Category'],
+            column_config={
+                'Purchased': st.column_config.CheckboxColumn("Purchased"),
+                'Qty': st.column_config.NumberColumn("Qty", min_value=1, step=1, format="%d", required=True),
+                'Remove': st.column_config.CheckboxColumn("Remove"),
+            },
+        )
+        save_col, checkout_col = st.columns(2)
+        save = save_col.form_submit_button("Save changes", use_container_width=True)
+        checkout = checkout_col.form_submit_button("Purchase checked", use_container_width=True)
+    st.caption(f"Showing {len(rows)} of {len(grocery_list)} item(s)")
+    if not (save or checkout):
+        return
+    # A cleared Qty cell comes back as NaN
+    blank = edited['Qty'].isna() & ~edited['Remove']
+    if blank.any():
+        st.error(f"Please enter a quantity for: {', '.join(edited.loc[blank, 'Item'])}")
+        return
+
+    # Build one batch event: field updates, then removals from the back, then
+    # checkout. Rows are matched to list items by id.
+    positions = {item['id']: idx for idx, item in enumerate(grocery_list)}
+    events = []
+    # Rows being removed need no update
+    changed = ((edited['Purchased'] != table['Purchased']) | (edited['Qty'] != table['Qty'])) & ~edited['Remove']
+    for item_id in edited.index[changed]:
+        idx = positions[item_id]
+        events.append({'op': 'list_update', 'index': idx, 'target': item_ref(grocery_list[idx]), 'fields': {
+            'purchased': bool(edited.at[item_id, 'Purchased']),
+            'quantity': int(edited.at[item_id, 'Qty'])
+        }})
+    removed = set(edited.index[edited['Remove']])
+    events.extend(
+        {'op': 'list_pop', 'index': idx, 'target': item_ref(grocery_list[idx])}
+        for idx in sorted((positions[item_id] for item_id in removed), reverse=True)
+    )
+    purchased = []
+    if checkout:
+        purchased = [
+            dict(grocery_list[positions[item_id]], quantity=int(edited.at[item_id, 'Qty']))
+            for item_id in edited.index[edited['Purchased']] if item_id not in removed
+        ]
+        if purchased:
+            events.append(core.checkout_items(purchased))
+    if not events:
+        st.info("No changes to save.")
+        return
+    commit_event({'op': 'batch', 'events': events})
+    if purchased:
+        st.success(f"Purchased {len(purchased)} item(s)!")
+    st.rerun()
+
+# Main App
+def render_profile_panel(sample):
+    # Per-rerun breakdown (times are inclusive, so cards contain the functions they call)
+    with st.sidebar.expander("Profiling"):
+        st.caption(f"Rerun: {sample['rerun_ms']:.1f} ms")
+        rows = [dict(name=name, **stats) for name, stats in sample['timings'].items()]
+        if rows:
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        for name, value in sample['counters'].items():
+            st.caption(f"{name}: {value}")
+        st.caption(f"Samples are appended to {profiling.PROFILE_LOG}")
+
+def main():
+
+    # Sidebar
+    households = list_households(HOUSEHOLDS_DIR)
+    if st.session_state.household not in households:
+        households.append(st.session_state.household)
+    st.session_state.household_select = st.session_state.household
+    st.sidebar.selectbox("Household", households, key="household_select", on_change=on_household_selected)
+    st.sidebar.text_input("New household", key="new_household", placeholder="e.g., smith-family", on_change=on_household_created)
+
+    load_stats = st.session_state.load_stats
+    st.sidebar.caption(f"Data cache: {load_stats['hits']} hit(s), {load_stats['misses']} miss(es)")
+  
+    # App Title
+    st.markdown('<div class="app-title">Smart Grocery Shopping Assistant</div>', unsafe_allow_html=True)
+    st.markdown('<div class="app-subtitle">AI-powered assistant that predicts missing items, suggests healthier alternatives, and reminds you about expiring products</div>', unsafe_allow_html=True)
+
+    # Add Item & Grocery List
+    row1_col1, row1_col2 = st.columns([1, 2])
+
+    # Add Item
+    with row1_col1, profiling.span('card: Add Item'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color:#38A169;">Add Item</h3>', unsafe_allow_html=True)
+        render_add_item()
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Grocery List
+    with row1_col2, profiling.span('card: Grocery List'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color:#DD6B20;"> Current Grocery List</h3>', unsafe_allow_html=True)
+        if st.session_state.grocery_list:
+            list_view = st.radio(
+                "View", ["Rows", "Table"], horizontal=True, key="list_view", label_visibility="collapsed",
+                index=0 if len(st.session_state.grocery_list) <= LIST_ROWS_LIMIT else 1
+            )
+            if list_view == "Rows":
+                render_list_rows()
+            else:
+                render_list_table()
+        else:
+            st.info("Your grocery list is empty. Add items above!")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Suggestions / Expiring
+    row2_col1, row2_col2, row2_col3 = st.columns([1,1,1])
+
+    # Healthier Alternatives
+    with row2_col1, profiling.span('card: Healthier Alternatives'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h4 style="color:#38A169;">Healthier Alternatives</h4>', unsafe_allow_html=True)
+        healthier_suggestions = suggest_healthier_alternatives()
+        if healthier_suggestions:
+            for sug_idx, sug in enumerate(healthier_suggestions):
+                with st.expander(f"Replace '{sug['current']}' with '{sug['alternative']}'"):
+                    st.markdown(f"<p style='color:#3182CE;'>Reason: {sug['reason']}</p>", unsafe_allow_html=True)
+                    if st.button("Replace", key=f"rep_{sug_idx}_{sug['item_id']}", use_container_width=True):
+                        for item_idx, item in enumerate(st.session_state.grocery_list):
+                            if item.get('id') == sug['item_id']:
+                                target = item_ref(item)
+                                item['name'] = sug['alternative']
+                                save_data({'op': 'list_update', 'index': item_idx, 'target': target, 'fields': {'name': sug['alternative']}})
+                                st.success(f"Replaced with {sug['alternative']}!")
+                                st.rerun()
+        else:
+            st.info("No unhealthy items detected.")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # AI Missing Items
+    with row2_col2, profiling.span('card: AI Missing Items'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h4 style="color:#3182CE;">AI Missing Items</h4>', unsafe_allow_html=True)
+        
+        # Only predict missing items if grocery list is not empty
+        if st.session_state.grocery_list:
+            missing_items = predict_missing_items()
+            # Filter out items already in the grocery list
+            current_items = [item['name'].lower().strip() for item in st.session_state.grocery_list]
+            missing_items = [item for item in missing_items if item['item'].lower().strip() not in current_items]
+            
+            if missing_items:
+                for sug_idx, sug in enumerate(missing_items):
+                    with st.expander(f"{sug['item']}"):
+                        st.markdown(f"<p style='color:#4A5568;'>Reason: {sug['reason']}</p>", unsafe_allow_html=True)
+                        if st.button("Add", key=f"add_missing_{sug_idx}", use_container_width=True):
+                            new_item = {
+                                'id': new_item_id(),
+                                'name': sug['item'],
+                                'category': sug.get('category', 'Other'),
+                                'quantity': sug.get('quantity', 1.0),
+                                'added_date': datetime.now().strftime('%Y-%m-%d'),
+                                'purchased': False
+                            }
+                            st.session_state.grocery_list.append(new_item)
+                            save_data({'op': 'list_insert', 'index': None, 'item': new_item})
+                            st.success(f"Added {sug['item']} to your list!")
+                            st.rerun()
+            else:
+                st.info("No missing item suggestions now.")
+        else:
+            st.info("Your grocery list is empty. Add items to see AI suggestions.")
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # Expiring Items
+    with row2_col3, profiling.span('card: Expiring Items'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h4 style="color:#DD6B20;">Expiring Items</h4>', unsafe_allow_html=True)
+        exp_items = get_expiring_items()
+        if exp_items:
+            for item_m in exp_items:
+                st.markdown(f"<p style='color:#E53E3E;'>{item_m['message'] if isinstance(item_m, dict) else item_m}</p>", unsafe_allow_html=True)
+        else:
+            st.info(" No items expiring soon.")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+
+    # Analytics
+    # Read from the rollups (analytics.py), which are updated as purchases are recorded
+    with profiling.span('card: Analytics'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color:#805AD5;"> Analytics</h3>', unsafe_allow_html=True)
+        rollups = get_analytics()
+        if rollups.purchases:
+            today = datetime.now().toordinal()
+            weeks = rollups.category_weeks(today)
+            st.markdown("**Quantity per category, last 8 weeks**")
+            st.bar_chart(pd.DataFrame([totals for _, totals in weeks], index=[start for start, _ in weeks]).fillna(0))
+            top_col, waste_col, swap_col = st.columns(3)
+            with top_col:
+                st.markdown("**Top items**")
+                st.dataframe(pd.DataFrame(rollups.top_items(), columns=["Item", "Purchases", "Quantity"]), hide_index=True)
+            with waste_col:
+                recent_waste, total_waste = rollups.wasted(today)
+                st.markdown("**Estimated waste**")
+                st.metric("Expired before use, last 8 weeks", f"{sum(recent_waste.values()):g}", help=f"{total_waste:g} in all. A line counts once its expired date passed before the item was bought again.")
+                if recent_waste:
+                    st.dataframe(pd.DataFrame(sorted(recent_waste.items(), key=lambda entry: -entry[1]), columns=["Category", "Quantity"]), hide_index=True)
+            with swap_col:
+                st.markdown("**Healthy swaps**")
+                swaps = rollups.swap_adoption()
+                if swaps:
+                    st.dataframe(pd.DataFrame([
+                        {'Item': item, 'Alternative': alt, 'Adoption': f"{alt_lines / (item_lines + alt_lines):.0%}"}
+                        for item, alt, item_lines, alt_lines in swaps
+                    ]), hide_index=True)
+                else:
+                    st.info("No swappable items bought yet.")
+        else:
+            st.info(" Analytics appear after your first purchase.")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Purchase History
+    with profiling.span('card: Purchase History'):
+        st.markdown('<div class="card">', unsafe_allow_html=True)
+        st.markdown('<h3 style="color:#718096;"> Purchase History</h3>', unsafe_allow_html=True)
+        line_count = history_line_count()
+        if line_count:
+            page_size = 50
+            col1, col2 = st.columns(2)
+            with col1:
+                item_filter = st.text_input("Item", key="history_item", placeholder="All items").strip()
+            with col2:
+                period = st.selectbox("Period", list(HISTORY_PERIODS), key="history_period")
+            days = HISTORY_PERIODS[period]
+            if item_filter or days:
+                # Searches go to the store's item/date queries instead of the full history
+                start = (datetime.now().date() - timedelta(days=days)).isoformat() if days else None
+                results = PurchaseHistoryFrame(search_history(item_filter, start))
+                line_count = len(results)
+                get_page = results.page
+            else:
+                # Only the selected page is sent to the browser; archived months are read when a page reaches them
+                get_page = get_history_page
+            page_count = max(1, -(-line_count // page_size))
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="history_page")
+            page = min(page, page_count)
+            st.dataframe(get_page(page - 1, page_size), hide_index=True)
+            caption = f"{line_count} purchased item(s), page {page} of {page_count}"
+            segments = st.session_state.archive.segments()
+            if segments and get_page is get_history_page:
+                caption += f" ({st.session_state.archive.line_count()} archived in {len(segments)} monthly segment(s))"
+            st.caption(caption)
+        else:
+            st.info(" No purchase history yet.")
+        st.markdown('</div>', unsafe_allow_html=True)
+
+    # Profiling
+    sample = profiling.finish_rerun(household=st.session_state.household)
+    if sample:
+        render_profile_panel(sample)
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        # Still records runs cut short by st.rerun() (or an error); a no-op
+        # when main() already finished the sample
+        profiling.finish_rerun(household=st.session_state.household, interrupted=True)
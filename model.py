@@ -0,0 +1,185 @@
+from collections.abc import Mapping
+from datetime import date
+from sys import intern
+
+from history_index import date_ordinal
+
+# Compact Purchase History
+# Purchases and purchase lines as __slots__ objects instead of JSON dicts:
+# dates are day ordinals and names and categories are interned, so a large
+# history stores each distinct string once (the Add Item categories are
+# shared constants). Both classes are read-only Mappings with the JSON field
+# names, so code written against the dict schema keeps working, and to_json()
+# returns exactly the dict they were built from. A date is only stored as an
+# ordinal when formatting it back gives the original string; anything else
+# (blank, None, malformed) is kept as-is, with raw ints boxed in a 1-tuple so
+# they cannot be mistaken for ordinals.
+CATEGORIES = ("Dairy", "Fruits", "Vegetables", "Meat", "Bakery", "Beverages", "Snacks", "Grains", "Condiments", "Other")
+
+_MISSING = object()
+# Canonical date string <-> ordinal, filled as dates are seen
+_ORDINALS = {}
+_DATE_STRINGS = {}
+
+
+def date_string(ordinal):
+    value = _DATE_STRINGS.get(ordinal)
+    if value is None:
+        value = _DATE_STRINGS[ordinal] = date.fromordinal(ordinal).strftime('%Y-%m-%d')
+    return value
+
+
+def _pack_date(value):
+    if type(value) is str:
+        ordinal = _ORDINALS.get(value)
+        if ordinal is not None:
+            return ordinal
+        try:
+            ordinal = date_ordinal(value)
+        except ValueError:
+            return value
+        if date_string(ordinal) == value:
+            _ORDINALS[value] = ordinal
+            return ordinal
+        return value
+    return (value,) if type(value) is int else value
+
+
+def _unpack_date(value):
+    if type(value) is int:
+        return date_string(value)
+    return value[0] if type(value) is tuple else value
+
+
+class PurchaseLine(Mapping):
+    __slots__ = ('name', 'category', 'quantity', '_added', '_expired', '_extra')
+
+    FIELDS = ('name', 'category', 'quantity', 'added_date', 'expired_date')
+    _FIELD_SET = frozenset(FIELDS)
+
+    def __init__(self, line):
+        # Inlined interning / ordinal lookups: this runs once per history line
+        get = line.get
+        name = get('name', _MISSING)
+        category = get('category', _MISSING)
+        self.name = intern(name) if type(name) is str else name
+        self.category = intern(category) if type(category) is str else category
+        self.quantity = get('quantity', _MISSING)
+        added = get('added_date', _MISSING)
+        self._added = (type(added) is str and _ORDINALS.get(added)) or _pack_date(added)
+        expired = get('expired_date', _MISSING)
+        self._expired = (type(expired) is str and _ORDINALS.get(expired)) or _pack_date(expired)
+        if self._FIELD_SET.issuperset(line):
+            self._extra = None
+        else:
+            self._extra = {key: value for key, value in line.items() if key not in self._FIELD_SET}
+
+    @property
+    def added_day(self):
+        # Ordinal of added_date, or None when it is missing or not a plain date
+        return self._added if type(self._added) is int else None
+
+    @property
+    def expired_day(self):
+        return self._expired if type(self._expired) is int else None
+
+    def get(self, key, default=None):
+        if key == 'name':
+            value = self.name
+        elif key == 'category':
+            value = self.category
+        elif key == 'quantity':
+            value = self.quantity
+        elif key == 'added_date':
+            value = _unpack_date(self._added)
+        elif key == 'expired_date':
+            value = _unpack_date(self._expired)
+        else:
+            return self._extra.get(key, default) if self._extra is not None else default
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for key in self.FIELDS:
+            if self.get(key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"PurchaseLine({self.to_json()!r})"
+
+    def to_json(self):
+        return {key: self[key] for key in self}
+
+
+class Purchase(Mapping):
+    # A purchase without 'items' reads as having none but is written back without the key
+    __slots__ = ('_date', 'lines', '_has_items', '_extra')
+
+    _KEYS = frozenset(('date', 'items'))
+
+    def __init__(self, purchase):
+        self._date = _pack_date(purchase.get('date', _MISSING))
+        self._has_items = 'items' in purchase
+        self.lines = [PurchaseLine(line) for line in purchase.get('items', [])]
+        if self._KEYS.issuperset(purchase):
+            self._extra = None
+        else:
+            self._extra = {key: value for key, value in purchase.items() if key not in self._KEYS}
+
+    @property
+    def day(self):
+        return self._date if type(self._date) is int else None
+
+    def __getitem__(self, key):
+        if key == 'date' and self._date is not _MISSING:
+            return _unpack_date(self._date)
+        if key == 'items':
+            return self.lines
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        if self._date is not _MISSING:
+            yield 'date'
+        if self._has_items:
+            yield 'items'
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Purchase({self.to_json()!r})"
+
+    def to_json(self):
+        data = {key: self[key] for key in self}
+        if self._has_items:
+            data['items'] = [line.to_json() for line in self.lines]
+        return data
+
+
+def compact_history(purchase_history):
+    return [purchase if isinstance(purchase, Purchase) else Purchase(purchase) for purchase in purchase_history]
+
+
+def expired_day(line):
+    # Ordinal of a line's expired_date, or None when it has none
+    day = getattr(line, 'expired_day', None)
+    if day is not None:
+        return day
+    try:
+        return date_ordinal(line.get('expired_date'))
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,175 @@
+import heapq
+from bisect import bisect_left
+from collections import Counter
+
+from catalog import HEALTHIER_ALTERNATIVES, SHELF_LIFE, normalize_name
+
+# Item Name Index
+# Canonical item names for type-ahead. Names that differ only in case,
+# spacing or word order ("White rice", "white  Rice ", "rice white") share
+# one key and are shown with the spelling seen first. Lookups are served by:
+#   - the top PREFIX_DEPTH levels of a prefix trie, flattened into a dict of
+#     prefix -> best k entries, kept current as names are added;
+#   - a sorted list of word suffixes ("white rice", "rice") for longer
+#     prefixes, where two bisects find the matching range;
+#   - a trigram index for misspellings: the earliest (most-seen) names in
+#     each query trigram's postings are candidates, which are then ranked
+#     by trigram similarity.
+PREFIX_DEPTH = 4
+SCAN_LIMIT = 2000  # Suffix-range entries examined for a long prefix
+CANDIDATE_BUDGET = 4000  # Trigram postings read for a fuzzy lookup
+MIN_SIMILARITY = 0.3
+
+
+def clean_name(name):
+    # Display form: surrounding and repeated whitespace removed, case kept
+    return ' '.join(name.split())
+
+
+def name_key(name):
+    return ' '.join(sorted(normalize_name(name).split()))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _padded(text):
+    return f"  {text} "
+
+
+class NameIndex:
+    def __init__(self, k=8):
+        self.k = k
+        self._ids = {}  # key -> id
+        self.names = []  # id -> display name
+        self.weights = []  # id -> times seen (0 for catalog-only names)
+        self._padded = []  # id -> normalized name padded as for trigrams()
+        self._gram_counts = []  # id -> number of distinct trigrams
+        self._prefixes = {}  # prefix -> up to k ids, heaviest first
+        self._suffixes = []  # sorted normalized word suffixes
+        self._suffix_ids = []  # id for each entry of _suffixes
+        self._trigrams = {}  # trigram -> ids
+        self._pending = None  # (suffix, id) pairs not yet merged in while building
+
+    @classmethod
+    def build(cls, purchase_history=(), grocery_list=(), k=8, archived_items=()):
+        index = cls(k)
+        index._pending = []
+        # Newest purchases first, so their spelling becomes the canonical one
+        for item in grocery_list:
+            index.add(item['name'])
+        for purchase in purchase_history:
+            for item in purchase['items']:
+                index.add(item['name'])
+        # (name, line count) pairs from the history archive's segment summaries
+        for name, count in archived_items:
+            index.add(name, weight=count)
+        for name in list(SHELF_LIFE) + list(HEALTHIER_ALTERNATIVES):
+            index.add(name, weight=0)
+        for entry in HEALTHIER_ALTERNATIVES.values():
+            index.add(entry['alt'], weight=0)
+        pairs = sorted(index._pending)
+        index._suffixes = [suffix for suffix, _ in pairs]
+        index._suffix_ids = [name_id for _, name_id in pairs]
+        index._pending = None
+        return index
+
+    def __len__(self):
+        return len(self.names)
+
+    def canonical(self, name):
+        # The canonical spelling of a known name, or None
+        name_id = self._ids.get(name_key(name))
+        return None if name_id is None else self.names[name_id]
+
+    def add(self, name, weight=1):
+        display = clean_name(name)
+        if not display:
+            return
+        key = name_key(display)
+        name_id = self._ids.get(key)
+        words = normalize_name(display).split()
+        suffixes = [' '.join(words[i:]) for i in range(len(words))]
+        if name_id is None:
+            name_id = self._ids[key] = len(self.names)
+            self.names.append(display)
+            self.weights.append(weight)
+            for suffix in suffixes:
+                if self._pending is not None:
+                    self._pending.append((suffix, name_id))
+                else:
+                    position = bisect_left(self._suffixes, suffix)
+                    self._suffixes.insert(position, suffix)
+                    self._suffix_ids.insert(position, name_id)
+            text = ' '.join(words)
+            grams = trigrams(text)
+            self._padded.append(_padded(text))
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._trigrams.setdefault(gram, []).append(name_id)
+        elif weight:
+            self.weights[name_id] += weight
+        else:
+            return
+        self._update_prefixes(name_id, suffixes)
+
+    def _update_prefixes(self, name_id, suffixes):
+        weights = self.weights
+        weight = weights[name_id]
+        prefixes = {suffix[:length] for suffix in suffixes for length in range(1, min(len(suffix), PREFIX_DEPTH) + 1)}
+        for prefix in prefixes:
+            best = self._prefixes.get(prefix)
+            if best is None:
+                self._prefixes[prefix] = [name_id]
+                continue
+            if name_id in best:
+                best.remove(name_id)
+            elif len(best) >= self.k and weights[best[-1]] >= weight:
+                continue
+            position = len(best)
+            while position and weights[best[position - 1]] < weight:
+                position -= 1
+            best.insert(position, name_id)
+            del best[self.k:]
+
+    def _prefix_ids(self, prefix, k):
+        if len(prefix) <= PREFIX_DEPTH:
+            return self._prefixes.get(prefix, [])[:k]
+        start = bisect_left(self._suffixes, prefix)
+        end = bisect_left(self._suffixes, prefix + '\U0010ffff', start, min(start + SCAN_LIMIT, len(self._suffixes)))
+        ids = set(self._suffix_ids[start:end])
+        return heapq.nlargest(k, ids, key=self.weights.__getitem__)
+
+    def _fuzzy_ids(self, text, k):
+        grams = trigrams(text)
+        # Postings are in the order names were first seen, so a common
+        # trigram contributes its most-bought names
+        share = CANDIDATE_BUDGET // len(grams)
+        counts = Counter()
+        for gram in grams:
+            counts.update(self._trigrams.get(gram, ())[:share])
+        # Exact overlap for the best candidates: a trigram of the query is
+        # one of a name's trigrams iff it is a substring of the padded name
+        scored = []
+        for name_id, _ in counts.most_common(k * 4):
+            padded = self._padded[name_id]
+            overlap = sum(1 for gram in grams if gram in padded)
+            similarity = overlap / (len(grams) + self._gram_counts[name_id] - overlap)
+            if similarity >= MIN_SIMILARITY:
+                scored.append((similarity, self.weights[name_id], name_id))
+        scored.sort(reverse=True)
+        return [name_id for _, _, name_id in scored[:k]]
+
+    def suggest(self, query, k=None):
+        # Canonical names completing `query`, heaviest first, topped up with
+        # close spellings when fewer than k names share the prefix
+        k = k or self.k
+        text = ' '.join(normalize_name(query).split())
+        if not text:
+            return []
+        ids = self._prefix_ids(text, k)
+        if len(ids) < k:
+            ids = ids + [name_id for name_id in self._fuzzy_ids(text, k) if name_id not in ids]
+        return [self.names[name_id] for name_id in ids[:k]]
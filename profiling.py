@@ -0,0 +1,131 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+# Hot-Path Instrumentation
+# Timers, call counts and counters (e.g. bytes written) collected per rerun.
+# Off unless GROCERY_PROFILE is set: timed() then returns the function
+# unchanged and span() a shared no-op context, so the disabled cost is one
+# attribute lookup per card. Each Streamlit session runs its script in its own
+# thread, so the current rerun's recorder is thread-local; work done on other
+# threads (the debounced writer's timer) goes to a shared background recorder
+# that the next finished rerun drains. Samples are appended to PROFILE_LOG.
+ENABLED = os.environ.get('GROCERY_PROFILE', '') not in ('', '0')
+PROFILE_LOG = os.environ.get('GROCERY_PROFILE_LOG', 'grocery_profile.jsonl')
+
+_NOOP = nullcontext()
+_local = threading.local()
+
+
+class Recorder:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}  # name -> [calls, total seconds, max seconds]
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, name, elapsed):
+        with self._lock:
+            entry = self.timings.get(name)
+            if entry is None:
+                self.timings[name] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def drain(self):
+        with self._lock:
+            timings, counters = self.timings, self.counters
+            self.timings, self.counters = {}, {}
+        return timings, counters
+
+
+_background = Recorder()
+
+
+def _recorder():
+    return getattr(_local, 'recorder', None) or _background
+
+
+class _Span:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        # Also recorded when the block is cut short (st.rerun raises)
+        _recorder().add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name):
+    return _Span(name) if ENABLED else _NOOP
+
+
+def timed(name):
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    if ENABLED:
+        _recorder().add(name, value)
+
+
+def _rows(timings):
+    return {
+        name: {'calls': calls, 'total_ms': round(total * 1000, 3), 'max_ms': round(peak * 1000, 3)}
+        for name, (calls, total, peak) in sorted(timings.items(), key=lambda item: -item[1][1])
+    }
+
+
+def start_rerun():
+    if ENABLED:
+        _local.recorder = Recorder()
+
+
+def finish_rerun(**context):
+    # Closes the current rerun's recorder and returns its sample (None when disabled)
+    recorder = getattr(_local, 'recorder', None)
+    if recorder is None:
+        return None
+    _local.recorder = None
+    timings, counters = recorder.drain()
+    sample = dict(
+        context,
+        timestamp=datetime.now().isoformat(timespec='milliseconds'),
+        rerun_ms=round((time.perf_counter() - recorder.started) * 1000, 3),
+        timings=_rows(timings),
+        counters=counters,
+    )
+    background_timings, background_counters = _background.drain()
+    if background_timings or background_counters:
+        sample['background'] = {'timings': _rows(background_timings), 'counters': background_counters}
+    try:
+        with open(PROFILE_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(sample, ensure_ascii=False) + '\n')
+    except OSError:
+        pass
+    return sample
@@ -0,0 +1,317 @@
+import argparse
+import heapq
+import itertools
+import json
+import logging
+import os
+import threading
+import urllib.request
+from collections import Counter
+from datetime import date, datetime
+
+from catalog import DEFAULT_SHELF_LIFE, SHELF_LIFE
+from core import URGENT_DAYS, WARNING_DAYS, expiry_status, reminder_message
+from history_archive import purchase_key
+from model import date_string, expired_day
+from storage import open_store, read_json, write_json_atomic
+
+# Expiry Reminders
+# Purchased lines are queued by the day they cross the warning and urgent
+# thresholds (expired_date minus WARNING_DAYS / URGENT_DAYS). A check pops
+# only the entries that have come due, so it costs O(due * log queued)
+# regardless of how much is in the pantry. The queue is built from the
+# purchases committed to the store and extended when the store changes, so
+# purchases written by any session or process are picked up; the day checked
+# last is kept in a small state file so a restart does not repeat alerts
+# already sent.
+STAGES = (('warning', WARNING_DAYS), ('urgent', URGENT_DAYS))
+# A line's expired_date is its purchase day plus the item's shelf life, so only
+# purchases within the longest shelf life can still come due
+HISTORY_DAYS = max(max(SHELF_LIFE.values()), DEFAULT_SHELF_LIFE)
+
+logger = logging.getLogger(__name__)
+
+
+# Notification Sinks
+class FileSink:
+    # Appends one JSON line per notification
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send(self, notifications):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            for notification in notifications:
+                f.write(json.dumps(notification, ensure_ascii=False) + '\n')
+
+
+class WebhookSink:
+    # POSTs {"notifications": [...]} as JSON. `transport(url, body)` replaces
+    # the HTTP call, e.g. with a RecordingTransport when testing locally.
+    def __init__(self, url, transport=None, timeout=5):
+        self.url = url
+        self.transport = transport or self._post
+        self.timeout = timeout
+
+    def _post(self, url, body):
+        request = urllib.request.Request(url, data=body, headers={'Content-Type': 'application/json'}, method='POST')
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+    def send(self, notifications):
+        self.transport(self.url, json.dumps({'notifications': notifications}, ensure_ascii=False).encode('utf-8'))
+
+
+class RecordingTransport:
+    # Local stand-in for a webhook endpoint: keeps every payload it receives
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, url, body):
+        self.requests.append((url, json.loads(body)))
+
+
+def open_sink(spec, data_path):
+    # 'file' (next to the data file), 'file:<path>', 'webhook:<url>' or 'off'
+    if not spec or spec == 'off':
+        return None
+    if spec == 'file':
+        return FileSink(f"{data_path}.reminders.jsonl")
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        return FileSink(target)
+    if kind == 'webhook':
+        return WebhookSink(target)
+    raise ValueError(f"Unknown reminder sink: {spec}")
+
+
+def reminder_purchases(store, today=None):
+    # The purchases a queue needs, read through the store's date-window query
+    today_ordinal = (today or date.today()).toordinal()
+    return store.purchases_between(date_string(today_ordinal - HISTORY_DAYS), date_string(today_ordinal))
+
+
+# Reminder Queue
+class ReminderQueue:
+    def __init__(self, after=0):
+        self._heap = []
+        self._seq = itertools.count()  # Tie-breaker so lines are never compared
+        self.after = after  # Alert days up to this ordinal have been handled
+
+    @classmethod
+    def build(cls, purchase_history, today_ordinal, after=0):
+        queue = cls(after)
+        heap = queue._heap
+        for purchase in purchase_history:
+            for line in purchase['items']:
+                heap.extend(queue._entries(line, today_ordinal, after))
+        heapq.heapify(heap)
+        return queue
+
+    def __len__(self):
+        return len(self._heap)
+
+    def _entries(self, line, today_ordinal, after):
+        # Thresholds crossed on or before `after` were already reported
+        expires = expired_day(line)
+        if expires is None or expires < today_ordinal:
+            return
+        for stage, days in STAGES:
+            alert_day = expires - days
+            if alert_day > after:
+                yield (alert_day, next(self._seq), stage, expires, line)
+
+    def add_purchase(self, purchase, today_ordinal=None):
+        # A new line has not been reported yet, even if it is already inside
+        # the warning window (short shelf lives)
+        today_ordinal = today_ordinal or date.today().toordinal()
+        for line in purchase['items']:
+            for entry in self._entries(line, today_ordinal, 0):
+                heapq.heappush(self._heap, entry)
+
+    def pop_due(self, today_ordinal):
+        # Entries whose threshold day has come, in order
+        heap = self._heap
+        popped = []
+        while heap and heap[0][0] <= today_ordinal:
+            popped.append(heapq.heappop(heap))
+        return popped
+
+    def restore(self, entries):
+        # Put popped entries back, e.g. after a failed send
+        for entry in entries:
+            heapq.heappush(self._heap, entry)
+
+
+def due_lines(entries, today_ordinal):
+    # (line, days until expiry) per line that crossed a threshold and has not
+    # expired yet; a line crossing both thresholds is reported once
+    fired = {}
+    for _, _, _, expires, line in entries:
+        if expires >= today_ordinal:
+            fired[id(line)] = (line, expires - today_ordinal)
+    return list(fired.values())
+
+
+def notification(line, days_until_expiry, **context):
+    status = expiry_status(days_until_expiry)
+    return dict(
+        context,
+        item=line['name'],
+        category=line.get('category'),
+        quantity=line.get('quantity'),
+        expired_date=line.get('expired_date'),
+        days_until_expiry=days_until_expiry,
+        status=status,
+        message=reminder_message(line['name'], status, days_until_expiry),
+        created=datetime.now().isoformat(timespec='seconds'),
+    )
+
+
+# Scheduler
+# Checks the queue every `interval` seconds on a daemon thread and sends due
+# notifications to the sink before recording the day as checked, so a crash
+# in between repeats alerts rather than losing them.
+class ReminderScheduler:
+    def __init__(self, store, sink, state_path, interval=600, context=None):
+        self.store = store
+        self.sink = sink
+        self.state_path = state_path
+        self.interval = interval
+        self.context = context or {}
+        after = 0
+        if os.path.exists(state_path):
+            try:
+                after = date.fromisoformat(read_json(state_path)['last_checked']).toordinal()
+            except:
+                after = 0
+        self.queue = ReminderQueue(after)
+        self._version = None
+        self._seen = None  # Purchases queued so far, by purchase_key
+        self._newest = None  # Newest purchase date queued, where the next sync resumes
+        self._newest_keys = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.sync()
+
+    def sync(self, today=None):
+        # Brings the queue up to date with the store. Only purchases dated from
+        # the newest one seen onwards are read back (the store's date-window
+        # query) and pushed onto the existing queue; it is rebuilt from the full
+        # reminder window on the first sync, or when a purchase seen on that day
+        # has disappeared. Purchases seen before keep the checked-day cutoff; new
+        # ones are queued in full (see ReminderQueue.add_purchase). Returns the
+        # number of new purchases.
+        version = self.store.version()
+        if self._seen is not None and version is not None and version == self._version:
+            return 0
+        today_ordinal = (today or date.today()).toordinal()
+        if self._seen is None:
+            added = self._rebuild(today_ordinal)
+        else:
+            start = self._newest or date_string(today_ordinal - HISTORY_DAYS)
+            purchases = self.store.purchases_between(start, date_string(today_ordinal))
+            remaining = Counter(self._newest_keys)
+            added = []
+            for purchase in purchases:
+                key = purchase_key(purchase)
+                if remaining[key] > 0:
+                    remaining[key] -= 1
+                else:
+                    added.append(purchase)
+            if +remaining:
+                added = self._rebuild(today_ordinal)
+            else:
+                with self._lock:
+                    for purchase in added:
+                        self.queue.add_purchase(purchase, today_ordinal)
+                self._seen.update(purchase_key(purchase) for purchase in added)
+                self._track_newest(purchases)
+        self._version = version
+        return len(added)
+
+    def _rebuild(self, today_ordinal):
+        purchases = reminder_purchases(self.store, date.fromordinal(today_ordinal))
+        seen = self._seen
+        known, added = [], []
+        for purchase in purchases:
+            key = purchase_key(purchase)
+            if seen is None or seen[key] > 0:
+                if seen is not None:
+                    seen[key] -= 1
+                known.append(purchase)
+            else:
+                added.append(purchase)
+        queue = ReminderQueue.build(known, today_ordinal, self.queue.after)
+        for purchase in added:
+            queue.add_purchase(purchase, today_ordinal)
+        with self._lock:
+            self.queue = queue
+        self._seen = Counter(purchase_key(purchase) for purchase in purchases)
+        self._track_newest(purchases)
+        return added
+
+    def _track_newest(self, purchases):
+        # The newest purchase date, and the purchases on it, to resume from
+        newest = max((purchase['date'] for purchase in purchases if purchase.get('date')), default=None)
+        if newest is not None:
+            self._newest = newest
+            self._newest_keys = Counter(purchase_key(purchase) for purchase in purchases if purchase.get('date') == newest)
+
+    def run_once(self, today=None):
+        self.sync(today)
+        today_ordinal = (today or date.today()).toordinal()
+        with self._lock:
+            entries = self.queue.pop_due(today_ordinal)
+        notifications = [notification(line, days, **self.context) for line, days in due_lines(entries, today_ordinal)]
+        if notifications:
+            try:
+                self.sink.send(notifications)
+            except:
+                with self._lock:
+                    self.queue.restore(entries)
+                raise
+        if today_ordinal > self.queue.after:
+            self.queue.after = today_ordinal
+            write_json_atomic(self.state_path, {'last_checked': date_string(today_ordinal)})
+        return notifications
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Reminder check failed")
+            if self._stop.wait(self.interval):
+                return
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send expiry reminders for a grocery data file")
+    parser.add_argument('data', help="grocery data file (as passed to the app)")
+    parser.add_argument('--backend', default=os.environ.get('GROCERY_STORAGE', 'json'))
+    parser.add_argument('--sink', default='file', help="'file', 'file:<path>' or 'webhook:<url>'")
+    parser.add_argument('--interval', type=float, default=600, help="seconds between checks")
+    parser.add_argument('--once', action='store_true', help="check once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    household = os.path.splitext(os.path.basename(args.data))[0]
+    scheduler = ReminderScheduler(open_store(args.backend, args.data), open_sink(args.sink, args.data), f"{args.data}.reminders.json",
+                                  interval=args.interval, context={'household': household})
+    if args.once:
+        print(f"Sent {len(scheduler.run_once())} reminder(s)")
+    else:
+        scheduler._run()
@@ -0,0 +1,103 @@
+import heapq
+from bisect import bisect_left, insort
+
+from catalog import normalize_name
+from history_index import purchase_day
+
+# Purchase Cadence
+# Per normalized item name, an exponentially weighted moving average of the
+# days between purchases and of the quantity bought per purchase day, built in
+# one chronological pass over the history and updated as purchases come in.
+# Several lines for the same item on one day count as a single purchase day.
+# Items bought on too few days for a cadence are still suggested for a while
+# after their last purchase; (last day, name) pairs are kept sorted so those
+# are found with one bisect, at a cost that depends on the items bought in
+# that window rather than on every item ever bought.
+ALPHA = 0.3  # Weight of the newest interval / quantity
+MIN_DAYS = 2  # Purchase days needed before an item has a cadence
+RECENT_DAYS = 20  # Days an item without a cadence is suggested after its last purchase
+
+# Entry fields
+LAST, INTERVAL, PREV_QUANTITY, QUANTITY, DAY_QUANTITY, DAYS, CATEGORY, NAME = range(8)
+
+
+def _ewma(previous, value):
+    return value if previous is None else ALPHA * value + (1 - ALPHA) * previous
+
+
+class CadenceModel:
+    def __init__(self):
+        self.items = {}
+        self._by_last = []  # Sorted (last purchase day, name); None while building
+
+    @classmethod
+    def build(cls, purchase_history):
+        model = cls()
+        model._by_last = None
+        # History is newest-first; the averages need oldest-first
+        for purchase in reversed(purchase_history):
+            try:
+                model.record_purchase(purchase)
+            except:
+                continue
+        model._by_last = sorted((entry[LAST], name) for name, entry in model.items.items())
+        return model
+
+    def record_purchase(self, purchase):
+        ordinal = purchase_day(purchase)
+        items = self.items
+        for item in purchase['items']:
+            name = normalize_name(item['name'])
+            quantity = float(item.get('quantity') or 0)
+            category = item.get('category', 'Other')
+            entry = items.get(name)
+            if entry is None:
+                items[name] = [ordinal, None, None, quantity, quantity, 1, category, name]
+                if self._by_last is not None:
+                    insort(self._by_last, (ordinal, name))
+            elif ordinal == entry[LAST]:
+                # Another line on the same day: fold into that day's quantity
+                entry[DAY_QUANTITY] += quantity
+                entry[QUANTITY] = _ewma(entry[PREV_QUANTITY], entry[DAY_QUANTITY])
+            elif ordinal > entry[LAST]:
+                if self._by_last is not None:
+                    del self._by_last[bisect_left(self._by_last, (entry[LAST], name))]
+                    insort(self._by_last, (ordinal, name))
+                entry[INTERVAL] = _ewma(entry[INTERVAL], ordinal - entry[LAST])
+                entry[PREV_QUANTITY] = entry[QUANTITY]
+                entry[QUANTITY] = _ewma(entry[QUANTITY], quantity)
+                entry[DAY_QUANTITY] = quantity
+                entry[LAST] = ordinal
+                entry[DAYS] += 1
+                entry[CATEGORY] = category
+            # Lines dated before the item's last purchase day (out-of-order
+            # history) carry no usable interval and are skipped
+
+    def overdue(self, today_ordinal, k=10, exclude=(), min_ratio=1.0, max_ratio=4.0):
+        # Top k (ratio, entry) by days since last purchase over the usual
+        # interval. Items past max_ratio intervals are treated as no longer
+        # bought rather than very overdue.
+        def candidates():
+            for name, entry in self.items.items():
+                if entry[DAYS] < MIN_DAYS or name in exclude:
+                    continue
+                ratio = (today_ordinal - entry[LAST]) / max(entry[INTERVAL], 1.0)
+                if min_ratio <= ratio <= max_ratio:
+                    yield ratio, entry
+        return heapq.nlargest(k, candidates(), key=lambda candidate: candidate[0])
+
+    def recent(self, today_ordinal, k=10, exclude=(), days=RECENT_DAYS):
+        # Up to k entries without a cadence yet, bought within the last `days`
+        # days, most recently bought first
+        by_last = self._by_last
+        start = bisect_left(by_last, (today_ordinal - days, ''))
+        end = bisect_left(by_last, (today_ordinal + 1, ''))
+        found = []
+        for index in range(end - 1, start - 1, -1):
+            if len(found) >= k:
+                break
+            name = by_last[index][1]
+            entry = self.items[name]
+            if entry[DAYS] < MIN_DAYS and name not in exclude:
+                found.append(entry)
+        return found
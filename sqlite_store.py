@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import sys
+import threading
+
+import profiling
+from catalog import normalize_name
+from storage import FileLock, JournalStore, empty_state
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS list_items (
+    rowid INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    id INTEGER,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    category TEXT,
+    quantity,
+    added_date TEXT,
+    purchased INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS purchases (
+    purchase_id INTEGER PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    date TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS purchase_lines (
+    line_id INTEGER PRIMARY KEY,
+    purchase_id INTEGER NOT NULL REFERENCES purchases(purchase_id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    category TEXT,
+    quantity,
+    added_date TEXT,
+    expired_date TEXT
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_list_items_position ON list_items(position);
+CREATE INDEX IF NOT EXISTS idx_list_items_name_norm ON list_items(name_norm);
+CREATE INDEX IF NOT EXISTS idx_list_items_id ON list_items(id);
+CREATE INDEX IF NOT EXISTS idx_purchases_date ON purchases(date);
+CREATE INDEX IF NOT EXISTS idx_purchases_seq ON purchases(seq);
+CREATE INDEX IF NOT EXISTS idx_purchase_lines_purchase ON purchase_lines(purchase_id, position);
+CREATE INDEX IF NOT EXISTS idx_purchase_lines_name_norm ON purchase_lines(name_norm);
+"""
+
+LIST_COLUMNS = ('id', 'name', 'category', 'quantity', 'added_date', 'purchased')
+LINE_COLUMNS = ('name', 'category', 'quantity', 'added_date', 'expired_date')
+
+
+def _list_item_row(item):
+    return (item.get('id'), item['name'], normalize_name(item['name']), item.get('category'),
+            item.get('quantity'), item.get('added_date'), int(bool(item.get('purchased', False))))
+
+
+def _list_item_dict(row):
+    item = dict(zip(LIST_COLUMNS, row))
+    item['purchased'] = bool(item['purchased'])
+    return item
+
+
+def _line_dict(row):
+    return dict(zip(LINE_COLUMNS, row))
+
+
+# SQLite store
+# Same load()/save(state, event) surface as the stores in storage.py; events are
+# applied as small SQL statements and history can be queried by date or item.
+class SQLiteStore:
+    indexed = True  # Queries below are served from indexes (see core.search_history)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def lock(self):
+        return FileLock(self.db_path)
+
+    # Loading
+    def load(self):
+        with self._lock:
+            state = empty_state()
+            state['grocery_list'] = [
+                _list_item_dict(row) for row in self._conn.execute(
+                    'SELECT id, name, category, quantity, added_date, purchased '
+                    'FROM list_items ORDER BY position')
+            ]
+            state['purchase_history'] = self._purchases('', [])
+            state['settings'] = {
+                key: json.loads(value)
+                for key, value in self._conn.execute('SELECT key, value FROM settings')
+            }
+        return state
+
+    def _purchases(self, where, params):
+        purchases = {}
+        order = []
+        rows = self._conn.execute(
+            'SELECT p.purchase_id, p.date, l.name, l.category, l.quantity, l.added_date, l.expired_date '
+            'FROM purchases p LEFT JOIN purchase_lines l ON l.purchase_id = p.purchase_id '
+            f'{where} ORDER BY p.seq DESC, l.position', params)
+        for purchase_id, date, *line in rows:
+            if purchase_id not in purchases:
+                purchases[purchase_id] = {'date': date, 'items': []}
+                order.append(purchase_id)
+            if line[0] is not None:
+                purchases[purchase_id]['items'].append(_line_dict(line))
+        return [purchases[purchase_id] for purchase_id in order]
+
+    def version(self):
+        # data_version moves on commits from other connections, total_changes on ours
+        with self._lock:
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+            return (data_version, self._conn.total_changes)
+
+    # Queries
+    def purchases_between(self, start, end):
+        # Served from the date index without reading the rest of the history
+        with self._lock:
+            return self._purchases('WHERE p.date >= ? AND p.date <= ?', [start, end])
+
+    def purchases_for_item(self, name):
+        # Served from the name index; each purchase keeps only the item's lines
+        with self._lock:
+            return self._purchases('WHERE l.name_norm = ?', [normalize_name(name)])
+
+    # Saving
+    def save(self, state, event=None):
+        with self._lock, self._conn:
+            changes = self._conn.total_changes
+            if event is None:
+                self._replace_all(state)
+            else:
+                self._apply(event)
+            profiling.count('rows_written', self._conn.total_changes - changes)
+
+    def _replace_all(self, state):
+        conn = self._conn
+        conn.execute('DELETE FROM list_items')
+        conn.execute('DELETE FROM purchase_lines')
+        conn.execute('DELETE FROM purchases')
+        conn.execute('DELETE FROM settings')
+        conn.executemany(
+            'INSERT INTO list_items (position, id, name, name_norm, category, quantity, added_date, purchased) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ((position,) + _list_item_row(item) for position, item in enumerate(state['grocery_list'])))
+        history = state['purchase_history']
+        for index, purchase in enumerate(history):
+            self._insert_purchase(purchase, len(history) - index)
+        conn.executemany(
+            'INSERT INTO settings (key, value) VALUES (?, ?)',
+            ((key, json.dumps(value, default=str)) for key, value in state['settings'].items()))
+
+    def _insert_purchase(self, purchase, seq):
+        cursor = self._conn.execute('INSERT INTO purchases (seq, date) VALUES (?, ?)', (seq, purchase['date']))
+        self._conn.executemany(
+            'INSERT INTO purchase_lines (purchase_id, position, name, name_norm, category, quantity, added_date, expired_date) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            ((cursor.lastrowid, position, line['name'], normalize_name(line['name']), line.get('category'),
+              line.get('quantity'), line.get('added_date'), line.get('expired_date'))
+             for position, line in enumerate(purchase['items'])))
+
+    def _list_rowid(self, index):
+        row = self._conn.execute(
+            'SELECT rowid FROM list_items ORDER BY position LIMIT 1 OFFSET ?', (index,)).fetchone()
+        if row is None:
+            raise IndexError(f"No grocery list item at index {index}")
+        return row[0]
+
+    def _apply(self, event):
+        conn = self._conn
+        op = event['op']
+        if op == 'list_insert':
+            index = event.get('index')
+            if index is None:
+                position = conn.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM list_items').fetchone()[0]
+            elif index == 0:
+                position = conn.execute('SELECT COALESCE(MIN(position), 1) - 1 FROM list_items').fetchone()[0]
+            else:
+                position = conn.execute(
+                    'SELECT position FROM list_items ORDER BY position LIMIT 1 OFFSET ?', (index,)).fetchone()
+                if position is None:
+                    position = conn.execute('SELECT COALESCE(MAX(position), -1) + 1 FROM list_items').fetchone()
+                position = position[0]
+                conn.execute('UPDATE list_items SET position = position + 1 WHERE position >= ?', (position,))
+            conn.execute(
+                'INSERT INTO list_items (position, id, name, name_norm, category, quantity, added_date, purchased) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', (position,) + _list_item_row(event['item']))
+        elif op == 'list_update':
+            rowid = self._list_rowid(event['index'])
+            fields = dict(event['fields'])
+            if 'purchased' in fields:
+                fields['purchased'] = int(bool(fields['purchased']))
+            if 'name' in fields:
+                fields['name_norm'] = normalize_name(fields['name'])
+            assignments = ', '.join(f"{column} = ?" for column in fields)
+            conn.execute(f'UPDATE list_items SET {assignments} WHERE rowid = ?', list(fields.values()) + [rowid])
+        elif op == 'list_pop':
+            conn.execute('DELETE FROM list_items WHERE rowid = ?', (self._list_rowid(event['index']),))
+        elif op == 'purchase':
+            seq = conn.execute('SELECT COALESCE(MAX(seq), 0) + 1 FROM purchases').fetchone()[0]
+            self._insert_purchase(event['record'], seq)
+            if 'remove_ids' in event:
+                conn.executemany('DELETE FROM list_items WHERE id = ?', ((item_id,) for item_id in event['remove_ids']))
+            else:
+                conn.executemany('DELETE FROM list_items WHERE name = ?', ((name,) for name in event.get('remove_names', [])))
+        elif op == 'settings':
+            conn.executemany(
+                'INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)',
+                ((key, json.dumps(value, default=str)) for key, value in event['values'].items()))
+        elif op == 'batch':
+            for sub_event in event['events']:
+                self._apply(sub_event)
+        else:
+            raise ValueError(f"Unknown event op: {op}")
+
+
+# One-shot migration from the JSON data file (replaying its journal, if any)
+def migrate_json(json_path, db_path):
+    store = SQLiteStore(db_path)
+    store.save(JournalStore(json_path).load())
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python sqlite_store.py <grocery_data.json> <grocery_data.db>")
+        sys.exit(1)
+    migrate_json(sys.argv[1], sys.argv[2]).close()
+    print(f"Migrated {sys.argv[1]} -> {sys.argv[2]}")
@@ -0,0 +1,555 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+import profiling
+from catalog import normalize_name
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class ConflictError(Exception):
+    pass
+
+
+class FileLock:
+    # Exclusive advisory lock on <path>.lock, shared by every process and
+    # session that writes the same data file
+    def __init__(self, path):
+        self.lock_path = f"{path}.lock"
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.lock_path, 'a+')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+def empty_state():
+    return {'grocery_list': [], 'purchase_history': [], 'settings': {}}
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    state = empty_state()
+    state.update(data)
+    return state
+
+
+def file_signature(path):
+    # Cheap change detector: (mtime, size) of a file, or None if it does not exist
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def json_default(value):
+    # Compact model objects (model.py) know their JSON form; anything else is stringified
+    to_json = getattr(value, 'to_json', None)
+    return to_json() if to_json is not None else str(value)
+
+
+def write_json_atomic(path, data, indent=None):
+    # Write to a temp file and swap it in so a crash never leaves a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, default=json_default, indent=indent, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+        profiling.count('bytes_written', f.tell())
+    os.replace(tmp_path, path)
+
+
+# Mutation Events
+# Every change main() makes to the session state is described by one of these
+# records, so it can be journaled instead of rewriting the whole data file.
+def apply_event(state, event):
+    op = event['op']
+    grocery_list = state['grocery_list']
+    if op == 'list_insert':
+        index = event.get('index')
+        if index is None:
+            grocery_list.append(event['item'])
+        else:
+            grocery_list.insert(index, event['item'])
+    elif op == 'list_update':
+        grocery_list[event['index']].update(event['fields'])
+    elif op == 'list_pop':
+        grocery_list.pop(event['index'])
+    elif op == 'purchase':
+        state['purchase_history'].insert(0, event['record'])
+        if 'remove_ids' in event:
+            # Checkout: exactly the purchased items leave the list
+            removed = set(event['remove_ids'])
+            state['grocery_list'] = [i for i in grocery_list if i.get('id') not in removed]
+        else:
+            removed = set(event.get('remove_names', []))
+            state['grocery_list'] = [i for i in grocery_list if i['name'] not in removed]
+    elif op == 'settings':
+        state['settings'].update(event['values'])
+    elif op == 'batch':
+        # Several events committed as one journal record / one write
+        for sub_event in event['events']:
+            apply_event(state, sub_event)
+    else:
+        raise ValueError(f"Unknown event op: {op}")
+    return state
+
+
+def purchases_between(state, start, end):
+    # Purchases dated start..end (YYYY-MM-DD, inclusive) in history order
+    return [purchase for purchase in state['purchase_history'] if start <= (purchase.get('date') or '') <= end]
+
+
+def purchases_for_item(purchases, name):
+    # The purchases that include an item (by normalized name), each with only
+    # that item's lines, in history order
+    key = normalize_name(name)
+    found = []
+    for purchase in purchases:
+        lines = [line for line in purchase['items'] if normalize_name(line['name']) == key]
+        if lines:
+            found.append({'date': purchase.get('date'), 'items': lines})
+    return found
+
+
+def new_item_id():
+    # Random 53-bit id: unique without coordinating sessions or processes, and
+    # still an exact JSON number in any client
+    return uuid.uuid4().int >> 75
+
+
+def item_ref(item):
+    # Identifies the list item an index-based event was aimed at
+    return {'id': item.get('id'), 'name': item['name']}
+
+
+def _find_target(grocery_list, event):
+    index = event['index']
+    target = event.get('target')
+    if target is None:
+        return index
+
+    def matches(item):
+        return item.get('id') == target['id'] and item['name'] == target['name']
+
+    if 0 <= index < len(grocery_list) and matches(grocery_list[index]):
+        return index
+    for i, item in enumerate(grocery_list):
+        if matches(item):
+            return i
+    raise ConflictError(f"'{target['name']}' was changed or removed in another session")
+
+
+def rebase_event(state, event):
+    # Applies an event written against an older state to a newer one, moving
+    # index-based events to wherever their target item is now. Returns the
+    # rebased event; raises ConflictError if the target no longer exists.
+    op = event['op']
+    if op == 'batch':
+        return dict(event, events=[rebase_event(state, sub_event) for sub_event in event['events']])
+    if op in ('list_update', 'list_pop'):
+        event = dict(event, index=_find_target(state['grocery_list'], event))
+    apply_event(state, event)
+    return event
+
+
+# Plain JSON file, rewritten in full on every save
+class JsonStore:
+    def __init__(self, path):
+        self.path = path
+
+    def lock(self):
+        return FileLock(self.path)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return empty_state()
+        return read_json(self.path)
+
+    def version(self):
+        return file_signature(self.path)
+
+    def purchases_between(self, start, end):
+        return purchases_between(self.load(), start, end)
+
+    def purchases_for_item(self, name):
+        return purchases_for_item(self.load()['purchase_history'], name)
+
+    def save(self, state, event=None):
+        write_json_atomic(self.path, state, indent=2)
+
+
+# Snapshot + append-only journal
+# The data file holds the last snapshot (tagged with the journal sequence it
+# covers) and <data file>.journal holds one JSON event per line written since.
+class JournalStore:
+    def __init__(self, path, compact_every=500):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_every = compact_every
+        self._lock = threading.Lock()
+        self._seq = None
+        self._pending = 0
+        self._generation = 0
+        self._compacting = False
+        self._snapshot_seq = None  # (snapshot file signature, its journal_seq)
+
+    def lock(self):
+        return FileLock(self.path)
+
+    def _read_journal(self):
+        # Returns the parsed events and the byte length of the valid prefix.
+        # A line without a trailing newline is a torn append from a crash.
+        events = []
+        valid = 0
+        if not os.path.exists(self.journal_path):
+            return events, valid
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    break
+                valid += len(line)
+        return events, valid
+
+    def _read(self):
+        state = read_json(self.path) if os.path.exists(self.path) else empty_state()
+        seq = state.pop('journal_seq', 0)
+        events, valid = self._read_journal()
+        replayed = 0
+        for event in events:
+            if event['seq'] <= seq:
+                continue
+            apply_event(state, event)
+            seq = event['seq']
+            replayed += 1
+        return state, seq, replayed, valid
+
+    def load(self):
+        with self._lock:
+            # Read-only: a torn tail may be another process's append in flight,
+            # so it is only dropped by the next append (made under the file lock)
+            state, seq, replayed, _ = self._read()
+            self._seq = seq
+            self._pending = replayed
+        return state
+
+    def version(self):
+        # The seq of the last change: every append and full snapshot takes a new
+        # one, while compaction only moves events into the snapshot, so sessions
+        # holding the version from before a compaction can still write straight
+        # through. Falls back to the file signatures if the journal tail is unreadable.
+        try:
+            return max(self._last_journal_seq(), self._snapshot_journal_seq())
+        except (ValueError, KeyError, TypeError):
+            return (file_signature(self.path), file_signature(self.journal_path))
+
+    def _snapshot_journal_seq(self):
+        # Parsed again only when the snapshot file changed on disk
+        signature = file_signature(self.path)
+        cached = self._snapshot_seq
+        if cached is None or cached[0] != signature:
+            seq = read_json(self.path).get('journal_seq', 0) if signature is not None else 0
+            cached = self._snapshot_seq = (signature, seq)
+        return cached[1]
+
+    def _last_journal_seq(self):
+        # seq of the last complete journal line, read back from the end of the file
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b''
+            while pos > 0:
+                step = min(4096, pos)
+                pos -= step
+                f.seek(pos)
+                tail = f.read(step) + tail
+                # The last piece is a torn append (or empty); the first may be cut off
+                lines = tail.split(b'\n')[:-1]
+                if pos > 0:
+                    lines = lines[1:]
+                if lines:
+                    return json.loads(lines[-1])['seq']
+        return 0
+
+    def purchases_between(self, start, end):
+        return purchases_between(self.load(), start, end)
+
+    def purchases_for_item(self, name):
+        return purchases_for_item(self.load()['purchase_history'], name)
+
+    def save(self, state, event=None):
+        if event is None:
+            self.write_snapshot(state)
+            return
+        with self._lock:
+            if self._seq is None:
+                self._seq = self._read()[1]
+            self._seq += 1
+            line = json.dumps(dict(event, seq=self._seq), default=json_default, ensure_ascii=False)
+            with open(self.journal_path, 'a+b') as f:
+                if f.seek(0, os.SEEK_END):
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        # Drop a torn line left by a crash mid-append
+                        f.truncate(self._read_journal()[1])
+                data = (line + '\n').encode('utf-8')
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            profiling.count('bytes_written', len(data))
+            self._pending += 1
+            start = self._pending >= self.compact_every and not self._compacting
+            if start:
+                self._compacting = True
+        if start:
+            threading.Thread(target=self.compact, daemon=True).start()
+
+    def write_snapshot(self, state):
+        with self._lock:
+            if self._seq is None:
+                self._seq = self._read()[1]
+            # A full snapshot is a change of its own (see version())
+            self._seq += 1
+            write_json_atomic(self.path, dict(state, journal_seq=self._seq))
+            self._snapshot_seq = (file_signature(self.path), self._seq)
+            # Events up to journal_seq are skipped on replay, so a crash before
+            # this truncate is harmless
+            open(self.journal_path, 'w').close()
+            self._pending = 0
+            self._generation += 1
+
+    def compact(self):
+        try:
+            with self._lock:
+                generation = self._generation
+            snapshot = file_signature(self.path)
+            # Rebuild from disk outside the lock so appends are not blocked
+            state, seq, _, _ = self._read()
+            tmp_path = f"{self.path}.compact"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(state, journal_seq=seq), f, default=json_default, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            with self.lock(), self._lock:
+                if generation != self._generation or file_signature(self.path) != snapshot:
+                    # A full snapshot (or another compaction) landed meanwhile,
+                    # from this process or another one; ours is stale
+                    os.remove(tmp_path)
+                    return
+                os.replace(tmp_path, self.path)
+                self._snapshot_seq = (file_signature(self.path), seq)
+                kept = [e for e in self._read_journal()[0] if e['seq'] > seq]
+                journal_tmp = f"{self.journal_path}.tmp"
+                with open(journal_tmp, 'w', encoding='utf-8') as f:
+                    for event in kept:
+                        f.write(json.dumps(event, default=json_default, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(journal_tmp, self.journal_path)
+                self._pending = len(kept)
+                self._generation += 1
+        finally:
+            self._compacting = False
+
+
+# Optimistic Writes
+# A session remembers the store version it last loaded or wrote. A write
+# against that version goes straight through; if someone else wrote in
+# between, the event is rebased onto the latest data, or rejected when it
+# cannot be (full-state saves, or an item that no longer exists).
+def commit(store, base_version, state, event, on_commit=None):
+    # Returns (new version, merged). on_commit runs under the store lock after a
+    # write that went straight through, never for a rebased or rejected one.
+    with store.lock():
+        if store.version() == base_version:
+            store.save(state, event)
+            if on_commit is not None:
+                on_commit()
+            return store.version(), False
+        if event is None:
+            raise ConflictError("The data was changed in another session since it was loaded")
+        latest = store.load()
+        store.save(latest, rebase_event(latest, event))
+        return store.version(), True
+
+
+# Debounced Writer
+# One per session. Events submitted within `delay` seconds of each other are
+# flushed together as a single batch event (at most `max_wait` after the
+# first), from a timer thread. Callbacks passed with an event run once the
+# flush that contains it commits without a rebase (see commit()).
+class DebouncedWriter:
+    def __init__(self, store, delay=0.5, max_wait=2.0):
+        self.store = store
+        self.delay = delay
+        self.max_wait = max_wait
+        self.version = None
+        self.needs_reload = False
+        self.notices = []
+        self._pending = []
+        self._callbacks = []
+        self._state = None
+        self._first_pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return bool(self._pending)
+
+    def loaded(self, version):
+        self.version = version
+        self.needs_reload = False
+
+    def submit(self, state, event, on_commit=None):
+        # Copy the containers so a flush on the timer thread never sees a half-made change
+        snapshot = {
+            'grocery_list': [dict(item) for item in state['grocery_list']],
+            'purchase_history': list(state['purchase_history']),
+            'settings': dict(state['settings'])
+        }
+        if event is None or self.delay <= 0:
+            with self._lock:
+                self._pending.append(event)
+                self._state = snapshot
+                if on_commit is not None:
+                    self._callbacks.append(on_commit)
+            self.flush()
+            return
+        with self._lock:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_pending = now
+            self._pending.append(event)
+            self._state = snapshot
+            if on_commit is not None:
+                self._callbacks.append(on_commit)
+            if self._timer is not None:
+                self._timer.cancel()
+            wait = max(0.0, min(self.delay, self._first_pending + self.max_wait - now))
+            self._timer = threading.Timer(wait, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            events, self._pending = self._pending, []
+            callbacks, self._callbacks = self._callbacks, []
+            state, self._state = self._state, None
+            if None in events:
+                event = None
+            elif len(events) == 1:
+                event = events[0]
+            else:
+                event = {'op': 'batch', 'events': events}
+            try:
+                self.version, merged = commit(self.store, self.version, state, event,
+                                              lambda: self._run_callbacks(callbacks))
+                if merged:
+                    self.needs_reload = True
+            except ConflictError as e:
+                self.notices.append(('warning', f"Your change was not saved: {e}"))
+                self.needs_reload = True
+            except Exception as e:
+                self.notices.append(('error', f"Error saving data: {e}"))
+                self.needs_reload = True
+
+    def _run_callbacks(self, callbacks):
+        # The data is already saved, so a failing callback only adds a notice
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.notices.append(('error', f"Error after saving data: {e}"))
+
+    def take_notices(self):
+        with self._lock:
+            notices, self.notices = self.notices, []
+        return notices
+
+
+# Households
+# Each household has its own data file; 'default' keeps the original one.
+def household_slug(name):
+    return re.sub(r'[^a-z0-9_-]+', '-', name.lower()).strip('-') or 'default'
+
+
+def household_path(name, default_path, directory):
+    slug = household_slug(name)
+    if slug == 'default':
+        return default_path
+    return os.path.join(directory, f"{slug}.json")
+
+
+# Data files that make a household (a journal household has no snapshot until it compacts)
+HOUSEHOLD_SUFFIXES = ('.json', '.db', '.json.journal')
+
+
+def household_stems(directory):
+    # Every household with a data file in directory, by file stem. Sidecar
+    # files (e.g. smith.json.reminders.json) have a dot left in the stem.
+    found = set()
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            for suffix in HOUSEHOLD_SUFFIXES:
+                stem = name[:-len(suffix)]
+                if name.endswith(suffix) and stem and '.' not in stem:
+                    found.add(stem)
+    return sorted(found)
+
+
+def list_households(directory):
+    return ['default'] + [stem for stem in household_stems(directory) if household_slug(stem) != 'default']
+
+
+def open_store(backend, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if backend == 'json':
+        return JsonStore(path)
+    if backend == 'journal':
+        return JournalStore(path)
+    if backend == 'sqlite':
+        from sqlite_store import SQLiteStore, migrate_json
+        db_path = os.path.splitext(path)[0] + '.db'
+        if not os.path.exists(db_path):
+            return migrate_json(path, db_path)
+        return SQLiteStore(db_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
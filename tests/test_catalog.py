@@ -0,0 +1,56 @@
+import random
+import string
+
+import pytest
+
+from catalog import HEALTHIER_ALTERNATIVES, HEALTHIER_MATCHER, SHELF_LIFE, SHELF_LIFE_MATCHER, CatalogMatcher
+
+
+def scan(catalog, name, default=None, contained_only=False):
+    # The linear scan the matcher replaces: earliest key in catalog order wins
+    name = name.lower().strip()
+    for key, value in catalog.items():
+        if key in name or (not contained_only and name in key):
+            return value
+    return default
+
+
+def random_names(rng, keys, count):
+    alphabet = string.ascii_lowercase + ' '
+    for _ in range(count):
+        kind = rng.random()
+        key = rng.choice(keys)
+        if kind < 0.25:
+            # Piece of a key
+            start = rng.randrange(len(key) + 1)
+            yield key[start:rng.randint(start, len(key))]
+        elif kind < 0.5:
+            # Key with words around it, odd case and spacing
+            yield f"  {rng.choice(['', 'organic ', 'Fresh '])}{key.upper() if rng.random() < 0.3 else key}{rng.choice(['', ' 2L', 's'])} "
+        elif kind < 0.7:
+            # Two keys run together
+            yield key + ' ' + rng.choice(keys)
+        else:
+            yield ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+
+
+@pytest.mark.parametrize('catalog, matcher', [
+    (SHELF_LIFE, SHELF_LIFE_MATCHER),
+    (HEALTHIER_ALTERNATIVES, HEALTHIER_MATCHER),
+])
+def test_matches_linear_scan(catalog, matcher):
+    rng = random.Random(7)
+    for name in random_names(rng, list(catalog), 3000):
+        assert matcher.lookup(name, 'none') == scan(catalog, name, 'none'), name
+        assert matcher.lookup(name, 'none', contained_only=True) == scan(catalog, name, 'none', contained_only=True), name
+
+
+def test_overlapping_keys_follow_catalog_order():
+    catalog = {'bread': 1, 'white bread': 2, 'rice': 3, 'brown rice': 4, 'ice': 5, 'ic': 6}
+    matcher = CatalogMatcher(catalog)
+    rng = random.Random(3)
+    for name in list(random_names(rng, list(catalog), 2000)) + ['', 'white bread', 'brown rice cakes', 'i', 'dice']:
+        assert matcher.lookup(name) == scan(catalog, name), name
+    assert matcher.match_key('Brown Rice') == 'rice'
+    assert matcher.match_key('c') == 'rice'
+    assert matcher.match_key('nothing here') is None
@@ -0,0 +1,238 @@
+import copy
+import json
+import time
+
+import pytest
+
+from storage import ConflictError, DebouncedWriter, JournalStore, commit, item_ref, open_store, rebase_event
+
+
+def item(item_id, name):
+    return {'id': item_id, 'name': name, 'category': 'Other', 'quantity': 1, 'added_date': '2026-03-01', 'purchased': False}
+
+
+def base_state():
+    return {'grocery_list': [item(1, 'Milk'), item(2, 'Bread'), item(3, 'Eggs')], 'purchase_history': [], 'settings': {}}
+
+
+def update(state, index, **fields):
+    return {'op': 'list_update', 'index': index, 'target': item_ref(state['grocery_list'][index]), 'fields': fields}
+
+
+def pop(state, index):
+    return {'op': 'list_pop', 'index': index, 'target': item_ref(state['grocery_list'][index])}
+
+
+def names(state):
+    return [entry['name'] for entry in state['grocery_list']]
+
+
+# Rebasing
+def test_rebase_moves_event_to_target():
+    old = base_state()
+    event = update(old, 2, quantity=5)
+    latest = base_state()
+    latest['grocery_list'].insert(0, item(4, 'Tea'))
+    rebased = rebase_event(latest, event)
+    assert rebased['index'] == 3
+    assert latest['grocery_list'][3] == dict(item(3, 'Eggs'), quantity=5)
+
+
+def test_rebase_matches_id_and_name():
+    old = base_state()
+    event = pop(old, 1)
+    latest = base_state()
+    latest['grocery_list'][1]['name'] = 'Rye Bread'
+    with pytest.raises(ConflictError):
+        rebase_event(latest, event)
+
+
+def test_rebase_of_removed_item_conflicts():
+    old = base_state()
+    event = update(old, 0, purchased=True)
+    latest = base_state()
+    del latest['grocery_list'][0]
+    with pytest.raises(ConflictError):
+        rebase_event(latest, event)
+
+
+def test_rebase_batch_and_untargeted_events():
+    old = base_state()
+    event = {'op': 'batch', 'events': [
+        pop(old, 2),
+        {'op': 'list_insert', 'index': None, 'item': item(5, 'Jam')},
+        {'op': 'settings', 'values': {'auto_suggest': False}},
+    ]}
+    latest = base_state()
+    latest['grocery_list'].reverse()
+    rebased = rebase_event(latest, event)
+    assert rebased['events'][0]['index'] == 0
+    assert names(latest) == ['Bread', 'Milk', 'Jam']
+    assert latest['settings'] == {'auto_suggest': False}
+
+
+# Optimistic commits
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def store(request, tmp_path):
+    store = open_store(request.param, str(tmp_path / 'grocery_data.json'))
+    store.save(base_state())
+    return store
+
+
+def other_session_pops_milk(store):
+    latest = store.load()
+    event = pop(latest, 0)
+    latest['grocery_list'].pop(0)
+    commit(store, store.version(), latest, event)
+
+
+def test_commit_on_current_version(store):
+    state = store.load()
+    event = update(state, 1, quantity=2)
+    state['grocery_list'][1]['quantity'] = 2
+    version, merged = commit(store, store.version(), state, event)
+    assert not merged
+    assert version == store.version()
+    assert store.load()['grocery_list'][1]['quantity'] == 2
+
+
+def test_stale_commit_is_rebased(store):
+    version = store.version()
+    state = store.load()
+    event = update(state, 2, quantity=4)
+    state['grocery_list'][2]['quantity'] = 4
+    other_session_pops_milk(store)
+    _, merged = commit(store, version, state, event)
+    assert merged
+    latest = store.load()
+    assert names(latest) == ['Bread', 'Eggs']
+    assert latest['grocery_list'][1]['quantity'] == 4
+
+
+def test_stale_commit_of_removed_item_is_rejected(store):
+    version = store.version()
+    state = store.load()
+    event = update(state, 0, quantity=9)
+    other_session_pops_milk(store)
+    with pytest.raises(ConflictError):
+        commit(store, version, state, event)
+    assert names(store.load()) == ['Bread', 'Eggs']
+
+
+def test_stale_full_save_is_rejected(store):
+    version = store.version()
+    state = store.load()
+    state['grocery_list'] = []
+    other_session_pops_milk(store)
+    with pytest.raises(ConflictError):
+        commit(store, version, state, None)
+    assert names(store.load()) == ['Bread', 'Eggs']
+
+
+def test_on_commit_runs_only_for_straight_writes(store):
+    calls = []
+    version = store.version()
+    state = store.load()
+    version, _ = commit(store, version, state, update(state, 1, quantity=2), lambda: calls.append('direct'))
+    other_session_pops_milk(store)
+    commit(store, version, store.load(), update(store.load(), 0, quantity=3), lambda: calls.append('rebased'))
+    assert calls == ['direct']
+
+
+def test_compaction_does_not_force_a_rebase(tmp_path):
+    store = JournalStore(str(tmp_path / 'grocery_data.json'), compact_every=1000)
+    store.save(base_state())
+    state = store.load()
+    version, _ = commit(store, store.version(), state, update(state, 1, quantity=2))
+    store.compact()
+    calls = []
+    event = update(state, 0, quantity=3)
+    state['grocery_list'][0]['quantity'] = 3
+    _, merged = commit(store, version, state, event, lambda: calls.append('direct'))
+    assert not merged and calls == ['direct']
+
+
+# Debounced writer
+@pytest.fixture
+def journal(tmp_path):
+    store = JournalStore(str(tmp_path / 'grocery_data.json'), compact_every=1000)
+    store.save(base_state())
+    return store
+
+
+def journal_events(store):
+    with open(store.journal_path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def submit_update(writer, state, index, **fields):
+    event = update(state, index, **fields)
+    state['grocery_list'][index].update(fields)
+    writer.submit(state, event)
+    return event
+
+
+def test_writer_batches_events_within_delay(journal):
+    writer = DebouncedWriter(journal, delay=0.2, max_wait=5)
+    writer.loaded(journal.version())
+    state = journal.load()
+    events = [submit_update(writer, state, index, purchased=True) for index in range(3)]
+    assert writer.pending
+    assert journal_events(journal) == []
+    writer.flush()
+    assert not writer.pending
+    [written] = journal_events(journal)
+    assert written['op'] == 'batch'
+    assert written['events'] == events
+    assert writer.version == journal.version()
+
+
+def test_writer_flushes_on_timer(journal):
+    writer = DebouncedWriter(journal, delay=0.05, max_wait=1)
+    writer.loaded(journal.version())
+    state = journal.load()
+    event = submit_update(writer, state, 0, quantity=2)
+    deadline = time.monotonic() + 5
+    while writer.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # A lone event is written as is
+    assert [{key: value for key, value in written.items() if key != 'seq'} for written in journal_events(journal)] == [event]
+
+
+def test_writer_flushes_after_max_wait(journal):
+    writer = DebouncedWriter(journal, delay=0.3, max_wait=0.5)
+    writer.loaded(journal.version())
+    state = journal.load()
+    start = time.monotonic()
+    # Each submit restarts the delay, but not past max_wait after the first
+    while time.monotonic() - start < 1.5 and not journal_events(journal):
+        submit_update(writer, state, 0, quantity=int((time.monotonic() - start) * 10) + 1)
+        time.sleep(0.1)
+    assert journal_events(journal)
+    assert time.monotonic() - start < 1.2
+    writer.flush()
+
+
+def test_full_save_flushes_at_once(journal):
+    writer = DebouncedWriter(journal, delay=10)
+    writer.loaded(journal.version())
+    state = journal.load()
+    submit_update(writer, state, 0, quantity=2)
+    state = copy.deepcopy(state)
+    state['settings'] = {'auto_suggest': False}
+    writer.submit(state, None)
+    assert not writer.pending
+    assert journal.load() == state
+
+
+def test_writer_reports_conflicts(journal):
+    writer = DebouncedWriter(journal, delay=0.2)
+    writer.loaded(journal.version())
+    state = journal.load()
+    submit_update(writer, state, 0, quantity=7)
+    other_session_pops_milk(journal)
+    writer.flush()
+    assert writer.needs_reload
+    [(level, message)] = writer.take_notices()
+    assert level == 'warning' and 'not saved' in message
+    assert names(journal.load()) == ['Bread', 'Eggs']
@@ -0,0 +1,51 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+import core
+from catalog import SHELF_LIFE
+from expiry import expiring_items
+
+TODAY = date(2026, 3, 15)
+NAMES = list(SHELF_LIFE) + ['Whole Milk', 'greek yogurt', 'Frozen Fish Fingers', 'mystery box', 'Item 42']
+
+
+def random_list(rng, size):
+    grocery_list = []
+    for item_id in range(size):
+        item = {'id': item_id, 'name': rng.choice(NAMES), 'category': 'Other', 'quantity': 1, 'purchased': False}
+        kind = rng.random()
+        if kind < 0.85:
+            item['added_date'] = (TODAY - timedelta(days=rng.randint(-3, 400))).isoformat()
+        elif kind < 0.9:
+            item['added_date'] = ''
+        elif kind < 0.95:
+            item['added_date'] = None
+        # else: no added_date at all
+        grocery_list.append(item)
+    return grocery_list
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_vectorized_matches_loop(seed):
+    rng = random.Random(seed)
+    grocery_list = random_list(rng, rng.randint(0, 300))
+    # Below BATCH_EXPIRY_THRESHOLD, core uses the per-item loop
+    assert len(grocery_list) < core.BATCH_EXPIRY_THRESHOLD
+    expected = core.get_expiring_items(core.GroceryState(grocery_list), TODAY)
+    assert expiring_items(grocery_list, TODAY) == expected
+
+
+def test_large_lists_use_the_vectorized_engine():
+    grocery_list = random_list(random.Random(1), core.BATCH_EXPIRY_THRESHOLD)
+    assert core.get_expiring_items(core.GroceryState(grocery_list), TODAY) == expiring_items(grocery_list, TODAY)
+
+
+def test_statuses_are_ordered_most_urgent_first():
+    grocery_list = [
+        {'name': 'Milk', 'added_date': (TODAY - timedelta(days=2)).isoformat()},  # 5 days left: warning
+        {'name': 'Milk', 'added_date': (TODAY - timedelta(days=10)).isoformat()},  # expired
+        {'name': 'Bread', 'added_date': (TODAY - timedelta(days=3)).isoformat()},  # 2 days left: urgent
+    ]
+    assert [reminder['status'] for reminder in expiring_items(grocery_list, TODAY)] == ['expired', 'urgent', 'warning']
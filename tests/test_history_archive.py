@@ -0,0 +1,72 @@
+import pytest
+
+from history_archive import HistoryArchive, archive_old_purchases, split_history
+from history_index import date_ordinal
+from storage import open_store
+
+CUTOFF = date_ordinal('2026-01-01')
+
+
+def purchase(day, name, quantity=1):
+    return {'date': day, 'items': [{'name': name, 'category': 'Dairy', 'quantity': quantity,
+                                    'added_date': day, 'expired_date': None}]}
+
+
+HISTORY = [purchase('2026-03-01', 'Milk'), purchase('2025-12-20', 'Eggs'), purchase('2025-12-05', 'Milk'),
+           purchase('2025-11-02', 'Bread')]
+
+
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def store(request, tmp_path):
+    store = open_store(request.param, str(tmp_path / 'grocery_data.json'))
+    save_history(store, HISTORY)
+    return store
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return HistoryArchive(str(tmp_path / 'grocery_data.json'))
+
+
+def save_history(store, purchases):
+    state = store.load()
+    state['purchase_history'] = [dict(p, items=[dict(line) for line in p['items']]) for p in purchases]
+    store.save(state)
+
+
+def archived(archive):
+    return [(p['date'], p['items'][0]['name'], p['items'][0]['quantity']) for p in archive.purchases()]
+
+
+def stored(store):
+    return [p['date'] for p in store.load()['purchase_history']]
+
+
+def test_interrupted_move_is_finished_without_duplicates(store, archive):
+    # Segments and index written, then stopped before the data file was saved
+    archive.add(split_history(store.load()['purchase_history'], CUTOFF)[1], CUTOFF)
+    assert len(stored(store)) == 4
+    assert archive_old_purchases(store, archive, CUTOFF) == 3
+    assert stored(store) == ['2026-03-01']
+    assert archived(archive) == [('2025-12-20', 'Eggs', 1), ('2025-12-05', 'Milk', 1), ('2025-11-02', 'Bread', 1)]
+    assert archive.purchase_count() == 3
+
+
+def test_genuine_repeat_of_an_archived_purchase_is_kept(store, archive):
+    archive_old_purchases(store, archive, CUTOFF)
+    # A merged data file brings the archived Milk purchase back, twice
+    save_history(store, [purchase('2026-03-01', 'Milk'), purchase('2025-12-05', 'Milk'), purchase('2025-12-05', 'Milk')])
+    assert archive.not_archived(split_history(store.load()['purchase_history'], CUTOFF)[1]) == [purchase('2025-12-05', 'Milk')]
+    assert archive_old_purchases(store, archive, CUTOFF) == 2
+    assert archived(archive).count(('2025-12-05', 'Milk', 1)) == 2
+    assert archive.purchase_count() == 4
+
+
+def test_restored_purchase_from_before_the_cutoff_is_archived(store, archive):
+    archive_old_purchases(store, archive, CUTOFF)
+    # A restored backup holds an old purchase the archive never saw
+    save_history(store, HISTORY[:1] + [purchase('2025-12-05', 'Milk', 2), purchase('2025-10-10', 'Jam')] + HISTORY[2:])
+    assert archive_old_purchases(store, archive, CUTOFF) == 4
+    assert stored(store) == ['2026-03-01']
+    assert archived(archive) == [('2025-12-20', 'Eggs', 1), ('2025-12-05', 'Milk', 2), ('2025-12-05', 'Milk', 1),
+                                 ('2025-11-02', 'Bread', 1), ('2025-10-10', 'Jam', 1)]
@@ -0,0 +1,27 @@
+from history_frame import PurchaseHistoryFrame
+
+
+def purchase(day, name):
+    return {'date': day, 'items': [{'name': name, 'category': 'Dairy', 'quantity': 1}]}
+
+
+def names(frame):
+    return list(frame.page(0, 100)['Item Name'])
+
+
+def test_undated_purchases_sort_last():
+    frame = PurchaseHistoryFrame([purchase('2026-10-01', 'Milk'), purchase('not a date', 'Eggs'),
+                                  purchase(None, 'Jam'), purchase('2026-09-01', 'Bread')])
+    assert names(frame) == ['Milk', 'Bread', 'Eggs', 'Jam']
+
+
+def test_appends_compare_against_the_newest_dated_purchase():
+    frame = PurchaseHistoryFrame([purchase(None, 'Jam'), purchase('2026-10-01', 'Milk')])
+    frame.append_purchase(purchase('2026-09-01', 'Bread'))
+    assert names(frame) == ['Milk', 'Bread', 'Jam']
+    frame.append_purchase(purchase('2026-10-05', 'Eggs'))
+    frame.append_purchase(purchase('', 'Tea'))
+    assert names(frame) == ['Eggs', 'Milk', 'Bread', 'Tea', 'Jam']
+    frame.add_purchases([purchase('2025-01-01', 'Rice')])
+    assert names(frame) == ['Eggs', 'Milk', 'Bread', 'Rice', 'Tea', 'Jam']
+    assert names(PurchaseHistoryFrame([purchase(None, 'Jam')])) == ['Jam']
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core import search_history
+from history_archive import HistoryArchive, archive_old_purchases
+from history_index import date_ordinal
+from storage import empty_state, open_store
+
+HISTORY = [
+    {'date': '2026-10-15', 'items': [{'name': 'Milk', 'category': 'Dairy', 'quantity': 1},
+                                     {'name': 'Bread', 'category': 'Bakery', 'quantity': 2}]},
+    {'date': '2026-08-01', 'items': [{'name': ' milk', 'category': 'Dairy', 'quantity': 3}]},
+    {'date': '2025-01-01', 'items': [{'name': 'Eggs', 'category': 'Dairy', 'quantity': 12}]},
+    {'date': '2024-12-20', 'items': [{'name': 'Milk', 'category': 'Dairy', 'quantity': 2}]},
+]
+
+
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def store(request, tmp_path):
+    store = open_store(request.param, str(tmp_path / 'grocery_data.json'))
+    state = empty_state()
+    state['purchase_history'] = [dict(purchase, items=list(purchase['items'])) for purchase in HISTORY]
+    store.save(state)
+    return store
+
+
+def session(store, archive=None):
+    return SimpleNamespace(purchase_history=store.load()['purchase_history'], archive=archive)
+
+
+def summary(purchases):
+    return [(purchase['date'], [line['quantity'] for line in purchase['items']]) for purchase in purchases]
+
+
+def test_purchases_for_item_keeps_only_its_lines(store):
+    assert summary(store.purchases_for_item('MILK')) == [('2026-10-15', [1]), ('2026-08-01', [3]), ('2024-12-20', [2])]
+    assert store.purchases_for_item('Jam') == []
+
+
+def test_search_by_item_and_window(store):
+    state = session(store)
+    assert summary(search_history(state, 'milk', '2026-01-01', store=store)) == [('2026-10-15', [1]), ('2026-08-01', [3])]
+    assert summary(search_history(state, start='2025-01-01', end='2026-09-30', store=store)) == [
+        ('2026-08-01', [3]), ('2025-01-01', [12])]
+
+
+def test_search_includes_matching_archive_months(store, tmp_path):
+    archive = HistoryArchive(str(tmp_path / 'grocery_data.json'))
+    assert archive_old_purchases(store, archive, date_ordinal('2026-01-01')) == 2
+    state = session(store, archive)
+    assert summary(search_history(state, 'Milk', store=store)) == [('2026-10-15', [1]), ('2026-08-01', [3]), ('2024-12-20', [2])]
+    assert summary(search_history(state, 'Eggs', end='2024-12-31', store=store)) == []
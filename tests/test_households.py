@@ -0,0 +1,31 @@
+import os
+
+from cli import find_households, run_reports
+from storage import empty_state, household_path, list_households, open_store
+
+
+def test_list_households_by_backend_files(tmp_path):
+    for name in ['smith.json', 'smith.json.reminders.json', 'smith.json.analytics.json', 'jones.db', 'jones.json.lock',
+                 'lee.json.journal', 'default.json', 'notes.txt']:
+        (tmp_path / name).write_text('')
+    assert list_households(str(tmp_path)) == ['default', 'jones', 'lee', 'smith']
+
+
+def test_missing_directory_lists_default_only(tmp_path):
+    assert list_households(str(tmp_path / 'households')) == ['default']
+
+
+def test_household_path():
+    assert household_path('default', 'grocery_data.json', 'households') == 'grocery_data.json'
+    assert household_path('Smith Family', 'grocery_data.json', 'households').endswith('smith-family.json')
+
+
+def test_cli_finds_journal_only_households(tmp_path):
+    store = open_store('journal', str(tmp_path / 'lee.json'))
+    store.save(empty_state(), {'op': 'settings', 'values': {'auto_suggest': False}})
+    for name in ['smith.json', 'smith.json.reminders.json', 'jones.db', 'default.json']:
+        (tmp_path / name).write_text('')
+    assert not (tmp_path / 'lee.json').exists()
+    paths = find_households(str(tmp_path))
+    assert [os.path.basename(path) for path in paths] == ['default.json', 'jones.json', 'lee.json', 'smith.json']
+    assert [report['report'] for report in next(run_reports(paths[2:3], 'journal', workers=1))] == ['expiry', 'replenishment']
@@ -0,0 +1,162 @@
+import copy
+import json
+import time
+
+import pytest
+
+from storage import JournalStore, apply_event, empty_state
+
+
+def item(item_id, name):
+    return {'id': item_id, 'name': name, 'category': 'Other', 'quantity': 1, 'added_date': '2026-03-01', 'purchased': False}
+
+
+EVENTS = [
+    {'op': 'list_insert', 'index': None, 'item': item(1, 'Milk')},
+    {'op': 'list_insert', 'index': 0, 'item': item(2, 'Bread')},
+    {'op': 'list_update', 'index': 1, 'fields': {'quantity': 3}},
+    {'op': 'settings', 'values': {'auto_suggest': False}},
+    {'op': 'purchase', 'record': {'date': '2026-03-02', 'items': [item(2, 'Bread')]}, 'remove_ids': [2]},
+    {'op': 'batch', 'events': [
+        {'op': 'list_insert', 'index': None, 'item': item(3, 'Eggs')},
+        {'op': 'list_pop', 'index': 0},
+    ]},
+]
+
+
+def expected_state(events):
+    state = empty_state()
+    for event in events:
+        apply_event(state, copy.deepcopy(event))
+    return state
+
+
+def write_events(store, events):
+    state = empty_state()
+    for event in events:
+        apply_event(state, copy.deepcopy(event))
+        store.save(state, event)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'grocery_data.json')
+
+
+def journal_lines(store):
+    with open(store.journal_path, 'rb') as f:
+        return f.read().splitlines(keepends=True)
+
+
+def test_replay_rebuilds_state(path):
+    write_events(JournalStore(path), EVENTS)
+    assert JournalStore(path).load() == expected_state(EVENTS)
+
+
+def test_replay_skips_events_in_snapshot(path):
+    store = JournalStore(path)
+    write_events(store, EVENTS[:3])
+    store.save(expected_state(EVENTS[:3]))  # Full snapshot, journal emptied
+    for event in EVENTS[3:]:
+        store.save(None, event)
+    reopened = JournalStore(path)
+    assert reopened.load() == expected_state(EVENTS)
+    # Sequence numbers carry on from the snapshot, which took one of its own
+    assert [json.loads(line)['seq'] for line in journal_lines(reopened)] == [5, 6, 7]
+
+
+def test_torn_tail_is_ignored_then_dropped_on_append(path):
+    store = JournalStore(path)
+    write_events(store, EVENTS[:2])
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'{"op": "list_pop", "index": 0, "se')
+
+    # Loading is read-only: the torn line stays (it may be an append in flight)
+    reopened = JournalStore(path)
+    assert reopened.load() == expected_state(EVENTS[:2])
+    assert journal_lines(reopened)[-1].endswith(b'"se')
+
+    reopened.save(None, EVENTS[2])
+    lines = journal_lines(reopened)
+    assert all(line.endswith(b'\n') for line in lines)
+    assert [json.loads(line)['seq'] for line in lines] == [1, 2, 3]
+    assert JournalStore(path).load() == expected_state(EVENTS[:3])
+
+
+def test_unparseable_line_ends_replay(path):
+    store = JournalStore(path)
+    write_events(store, EVENTS[:2])
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'not json\n')
+    assert JournalStore(path).load() == expected_state(EVENTS[:2])
+
+
+def test_compact_folds_journal_into_snapshot(path):
+    store = JournalStore(path, compact_every=1000)
+    write_events(store, EVENTS)
+    store.compact()
+    assert journal_lines(store) == []
+    with open(path, 'r', encoding='utf-8') as f:
+        assert json.load(f)['journal_seq'] == len(EVENTS)
+    assert JournalStore(path).load() == expected_state(EVENTS)
+
+
+def test_compaction_starts_after_compact_every_appends(path):
+    store = JournalStore(path, compact_every=4)
+    write_events(store, EVENTS)
+    deadline = time.monotonic() + 5
+    while store._compacting and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(journal_lines(store)) < len(EVENTS)
+    assert JournalStore(path).load() == expected_state(EVENTS)
+
+
+def test_compaction_overtaken_by_full_snapshot_is_discarded(path, monkeypatch):
+    store = JournalStore(path, compact_every=1000)
+    write_events(store, EVENTS[:3])
+    replaced = expected_state(EVENTS[:1])
+    read = store._read
+
+    def read_then_snapshot():
+        result = read()
+        # A full save lands while the compaction is writing its snapshot
+        store.save(replaced)
+        return result
+
+    monkeypatch.setattr(store, '_read', read_then_snapshot)
+    store.compact()
+    assert not store._compacting
+    assert JournalStore(path).load() == replaced
+
+
+def test_compaction_overtaken_by_another_process_is_discarded(path, monkeypatch):
+    store = JournalStore(path, compact_every=1000)
+    write_events(store, EVENTS[:3])
+    replaced = expected_state(EVENTS[:1])
+    read = store._read
+
+    def read_then_snapshot():
+        result = read()
+        # Another process (its own store, same files) saves in full meanwhile
+        other = JournalStore(path)
+        other.load()
+        other.save(replaced)
+        return result
+
+    monkeypatch.setattr(store, '_read', read_then_snapshot)
+    store.compact()
+    assert JournalStore(path).load() == replaced
+
+
+def test_compaction_keeps_the_version(path):
+    store = JournalStore(path, compact_every=1000)
+    write_events(store, EVENTS[:3])
+    version = store.version()
+    store.compact()
+    assert journal_lines(store) == []
+    assert store.version() == JournalStore(path).version() == version
+    write_events(store, EVENTS[:4])
+    assert store.version() != version
+    version = store.version()
+    store.save(expected_state(EVENTS[:4]))
+    assert store.version() != version
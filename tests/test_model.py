@@ -0,0 +1,52 @@
+import copy
+import json
+
+import pytest
+
+from model import Purchase, PurchaseLine, compact_history
+from storage import json_default
+
+
+def line(**fields):
+    return dict({'name': 'Milk', 'category': 'Dairy', 'quantity': 1, 'added_date': '2026-03-01', 'expired_date': '2026-03-08'}, **fields)
+
+
+PURCHASES = [
+    {'date': '2026-03-01', 'items': [line()]},
+    {'date': '2026-3-1', 'items': [line(added_date='2026-3-1', expired_date='2026-03-8')]},
+    {'date': None, 'items': [line(added_date='', expired_date=None)]},
+    {'date': '', 'items': [line(added_date=None)]},
+    {'date': 739000, 'items': [line(added_date=739000, expired_date=5)]},
+    {'date': '2026-03-02', 'items': [line(note='organic', quantity=2.5)], 'store': 'Corner shop'},
+    {'date': '2026-03-03'},
+    {'items': [{'name': 'Eggs'}]},
+]
+
+
+@pytest.mark.parametrize('purchase', PURCHASES)
+def test_round_trip_is_lossless(purchase):
+    original = copy.deepcopy(purchase)
+    compact = Purchase(purchase)
+    assert compact.to_json() == original
+    assert set(compact) == set(original)
+    assert json.loads(json.dumps(compact_history([purchase]), default=json_default)) == [original]
+
+
+def test_only_canonical_dates_become_days():
+    days = [Purchase(purchase).day for purchase in PURCHASES]
+    assert days[0] is not None and days[5] is not None
+    assert days[1:5] == [None, None, None, None]
+    assert PurchaseLine(line()).expired_day == days[0] + 7
+    assert PurchaseLine(line(expired_date=5)).expired_day is None
+    assert PurchaseLine(line(expired_date=5))['expired_date'] == 5
+
+
+def test_missing_keys_stay_missing():
+    without_items = Purchase({'date': '2026-03-03'})
+    assert without_items['items'] == [] and 'items' not in without_items.to_json()
+    bare = Purchase({'items': [{'name': 'Eggs'}]})
+    assert 'date' not in bare and bare.get('date') is None
+    eggs = bare['items'][0]
+    assert list(eggs) == ['name'] and eggs.get('quantity') is None
+    with pytest.raises(KeyError):
+        eggs['category']
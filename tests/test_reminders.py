@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from reminders import ReminderScheduler
+from storage import empty_state, open_store
+
+TODAY = date(2026, 10, 17)
+
+
+def purchase(day, name, expires):
+    return {'date': day, 'items': [{'name': name, 'category': 'Dairy', 'quantity': 1, 'added_date': day, 'expired_date': expires}]}
+
+
+class RecordingStore:
+    # Wraps a store and records the date windows it is asked for
+    def __init__(self, store):
+        self.store = store
+        self.windows = []
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def purchases_between(self, start, end):
+        self.windows.append((start, end))
+        return self.store.purchases_between(start, end)
+
+
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def store(request, tmp_path):
+    store = open_store(request.param, str(tmp_path / 'grocery_data.json'))
+    state = empty_state()
+    state['purchase_history'] = [purchase('2026-10-10', 'Milk', '2026-10-20'), purchase('2026-09-01', 'Cheese', '2026-11-30')]
+    store.save(state)
+    return RecordingStore(store)
+
+
+def add_purchase(store, record):
+    state = store.load()
+    state['purchase_history'].insert(0, record)
+    store.save(state)
+
+
+def test_new_purchases_are_read_from_the_newest_seen_day(store, tmp_path):
+    scheduler = ReminderScheduler(store, None, str(tmp_path / 'reminders.json'))
+    scheduler.sync(TODAY)
+    queue = scheduler.queue
+    queued = len(queue)
+    add_purchase(store, purchase('2026-10-17', 'Yogurt', '2026-10-24'))
+    assert scheduler.sync(TODAY) == 1
+    assert store.windows[-1] == ('2026-10-10', '2026-10-17')
+    assert scheduler.queue is queue and len(queue) == queued + 2
+    add_purchase(store, purchase('2026-10-17', 'Yogurt', '2026-10-24'))
+    assert scheduler.sync(TODAY) == 1
+    assert store.windows[-1] == ('2026-10-17', '2026-10-17')
+    assert scheduler.queue is queue and len(queue) == queued + 4
+
+
+def test_removed_purchase_rebuilds_the_queue(store, tmp_path):
+    scheduler = ReminderScheduler(store, None, str(tmp_path / 'reminders.json'))
+    scheduler.sync(TODAY)
+    state = store.load()
+    del state['purchase_history'][0]
+    store.save(state)
+    assert scheduler.sync(TODAY) == 0
+    assert store.windows[-1][0] < '2026-09-01'
+    assert [entry[4]['name'] for entry in scheduler.queue._heap] == ['Cheese', 'Cheese']
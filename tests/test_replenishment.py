@@ -0,0 +1,48 @@
+import random
+from datetime import date, timedelta
+
+import core
+from replenishment import DAYS, LAST, MIN_DAYS, NAME, CadenceModel
+
+TODAY = date(2026, 3, 15)
+NAMES = ['milk', 'bread', 'eggs', 'tea', 'jam', 'rice', 'apples', 'cheese', 'soap', 'flour'] + [f'item {i}' for i in range(40)]
+
+
+def purchase(day, *names):
+    return {'date': (TODAY - timedelta(days=day)).isoformat(),
+            'items': [{'name': name, 'category': 'Other', 'quantity': 1} for name in names]}
+
+
+def random_history(rng, count):
+    # Newest first, as stored
+    days = sorted(rng.randint(0, 200) for _ in range(count))
+    return [purchase(day, *rng.sample(NAMES, rng.randint(1, 4))) for day in days]
+
+
+def scan_recent(model, today_ordinal, k, exclude, days=20):
+    entries = [entry for name, entry in model.items.items()
+               if entry[DAYS] < MIN_DAYS and name not in exclude and 0 <= today_ordinal - entry[LAST] <= days]
+    entries.sort(key=lambda entry: (entry[LAST], entry[NAME]), reverse=True)
+    return entries[:k]
+
+
+def test_recent_matches_scan_after_build_and_updates():
+    rng = random.Random(5)
+    history = random_history(rng, 120)
+    model = CadenceModel.build(history[40:])
+    for new in reversed(history[:40]):
+        model.record_purchase(new)
+    fresh = CadenceModel.build(history)
+    today = TODAY.toordinal()
+    for k, exclude in [(10, set()), (3, {'milk', 'item 3'}), (100, set())]:
+        assert model.recent(today, k, exclude) == scan_recent(model, today, k, exclude)
+        assert fresh.recent(today, k, exclude) == scan_recent(fresh, today, k, exclude)
+    assert model._by_last == fresh._by_last
+
+
+def test_one_off_purchases_are_suggested_after_overdue_items():
+    history = [purchase(3, 'jam'), purchase(10, 'milk'), purchase(17, 'milk'), purchase(24, 'milk'), purchase(40, 'soap')]
+    state = core.GroceryState([{'id': 1, 'name': 'Bread', 'category': 'Bakery', 'quantity': 1}], history)
+    suggestions = core.predict_missing_items(state, TODAY)
+    assert [suggestion['item'] for suggestion in suggestions] == ['milk', 'jam']
+    assert suggestions[1]['overdue_days'] is None